@@ -1,44 +1,119 @@
+import importlib
+import os
+import click
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from dotenv import load_dotenv  # Import dotenv
-import os
 
 # ✅ Load environment variables before anything else
 load_dotenv()
 
-from config import Config
-from db import db
+from config import BASE_DIR, Config
+from db import db, init_engine
 from auth import auth_bp
 from routes import routes_bp
 from routes.dashboard import dashboard_bp
-from routes.gemini import gemini_bp 
-from routes.image_ocr import ocr_bp
-from routes.texttospeech import tts_bp
+from routes.profiles import profiles_bp
+from bulk import bulk_cli
+from search import ensure_search_index
+from instrumentation import init_query_counter
+from metrics import init_metrics
+from profiling import init_profiling
+from cache import cache
+from uploads import uploads
+from ocr_cache import ocr_cache
+from tts_audio import audio_cache
 
-app = Flask(__name__)
-app.config.from_object(Config)
+# Schema changes ship as Alembic migrations: `flask db upgrade` (Flask-Migrate).
+# Batch mode lets SQLite apply ALTERs by rebuilding the table.
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'migrations')
 
-db.init_app(app)
-jwt = JWTManager(app)
+# Optional features, enabled by Config.FEATURES: name -> (blueprint module,
+# blueprint, extension to initialise). The blueprint modules pull in the heavy
+# clients (requests, googletrans, tesseract, gTTS), so they are only imported
+# for the features a deployment actually serves.
+FEATURE_BLUEPRINTS = {
+    'gemini': ('routes.gemini', 'gemini_bp', None),
+    'ocr': ('routes.image_ocr', 'ocr_bp', ocr_cache),
+    'tts': ('routes.texttospeech', 'tts_bp', audio_cache),
+}
 
-# ✅ Allow CORS for all origins (Global Access)
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
 
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/auth')
-app.register_blueprint(routes_bp, url_prefix='/api')
-app.register_blueprint(dashboard_bp, url_prefix='/api')
-app.register_blueprint(gemini_bp, url_prefix='/api')
-app.register_blueprint(ocr_bp, url_prefix='/api')
-app.register_blueprint(tts_bp, url_prefix='/api')
+def create_app(config_object=Config):
+    """Application factory used by `flask run`, wsgi.py (gunicorn) and scripts."""
+    app = Flask(__name__)
+    app.config.from_object(config_object)
 
-# print("\n✅ Registered Routes:")
-# for rule in app.url_map.iter_rules():
-#     print(rule)
+    init_engine(app)
+    if click.get_current_context(silent=True) is not None:
+        # Only the flask CLI (`flask db ...`) needs Alembic; servers skip its ~350 ms import
+        init_migrations(app)
+    JWTManager(app)
+    init_query_counter(app)
+    init_metrics(app)
+    init_profiling(app)
+    cache.init_app(app)
+    uploads.init_app(app)
 
-if __name__ == '__main__':
+    # ✅ Allow CORS for all origins (Global Access)
+    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+
+    # Register blueprints
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(routes_bp, url_prefix='/api')
+    app.register_blueprint(dashboard_bp, url_prefix='/api')
+    app.register_blueprint(profiles_bp, url_prefix='/api')
+    register_features(app)
+
+    app.cli.add_command(bulk_cli)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables and the search index."""
+        init_db(app)
+        print("✅ Database initialized")
+
+    # print("\n✅ Registered Routes:")
+    # for rule in app.url_map.iter_rules():
+    #     print(rule)
+
+    return app
+
+
+def register_features(app):
+    for name in app.config['FEATURES']:
+        if name not in FEATURE_BLUEPRINTS:
+            raise ValueError(f"Unknown feature '{name}' in FEATURES (expected one of {', '.join(FEATURE_BLUEPRINTS)})")
+        module_name, blueprint_name, extension = FEATURE_BLUEPRINTS[name]
+        if extension is not None:
+            extension.init_app(app)
+        blueprint = getattr(importlib.import_module(module_name), blueprint_name)
+        app.register_blueprint(blueprint, url_prefix='/api')
+
+
+def init_migrations(app):
+    """Register Flask-Migrate on `app` (idempotent)."""
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+
+        Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+
+
+def init_db(app):
+    """Create a fresh database at the latest schema (existing ones: `flask db upgrade`)."""
+    from flask_migrate import stamp
+
+    init_migrations(app)
     with app.app_context():
         db.create_all()
+        ensure_search_index()
+        # create_all() already built the current schema; record it so upgrades start from here
+        stamp()
+
+
+if __name__ == '__main__':
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    app = create_app()
+    init_db(app)
     app.run(debug=True)
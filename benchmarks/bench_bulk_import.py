@@ -0,0 +1,93 @@
+"""Bulk NDJSON import vs one POST /api/articles per article.
+
+    python benchmarks/bench_bulk_import.py --articles 40000 --single 500
+
+Imports `--articles` generated articles through bulk.import_rows (the code
+behind POST /api/bulk/articles and `flask bulk import`), then times `--single`
+articles through the item endpoint and extrapolates to the same row count.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from common import make_app, random_sentence, seed
+
+from flask_jwt_extended import create_access_token
+
+from bulk import import_rows, parse_rows
+from db import db
+from search import ensure_search_index
+
+
+def generate(n, rng, prefix):
+    for i in range(n):
+        body = '<p>' + ' '.join(random_sentence(rng, 12) for _ in range(30)) + '</p>'
+        yield json.dumps({'title': random_sentence(rng, 8), 'slug': f'{prefix}-{i}', 'body': body,
+                          'category': f'category-{rng.randrange(10)}'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=40000)
+    parser.add_argument('--single', type=int, default=500, help='articles sent through the item endpoint')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    # Generated up front so only the import itself is timed
+    bulk_lines = list(generate(args.articles, rng, 'bulk'))
+    single_lines = list(generate(args.single, rng, 'single'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bulk.db'), TTS_PREGENERATE=False)
+        with app.app_context():
+            db.create_all()
+            ensure_search_index()
+            seed(n_categories=10, n_articles=0)
+            token = create_access_token(identity='1')
+
+            start = time.perf_counter()
+            report = import_rows('articles', parse_rows(bulk_lines, 'ndjson'),
+                                 args.chunk_size)
+            bulk_s = time.perf_counter() - start
+
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        start = time.perf_counter()
+        for line in single_lines:
+            row = json.loads(line)
+            client.post('/api/articles', headers=headers, data={
+                'title': row['title'], 'slug': row['slug'], 'body': row['body'],
+                'category_id': int(row['category'].split('-')[1]) + 1,
+            })
+        single_s = time.perf_counter() - start
+
+        with app.app_context():
+            db.engine.dispose()
+
+    single_rate = args.single / single_s
+    result = {
+        'articles': args.articles,
+        'bulk_seconds': round(bulk_s, 2),
+        'bulk_rows_per_s': round(report['inserted'] / bulk_s, 1),
+        'single_rows_per_s': round(single_rate, 1),
+        'single_estimated_seconds': round(args.articles / single_rate, 1),
+        'speedup': round((args.articles / single_rate) / bulk_s, 1),
+        'rejected': report['failed'],
+    }
+    print(f"bulk:   {result['articles']} articles in {result['bulk_seconds']}s "
+          f"({result['bulk_rows_per_s']} rows/s)")
+    print(f"single: {result['single_rows_per_s']} rows/s -> ~{result['single_estimated_seconds']}s "
+          f"for {result['articles']} ({result['speedup']}x slower)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
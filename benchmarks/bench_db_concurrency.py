@@ -0,0 +1,130 @@
+"""Mixed read/write load on SQLite from several processes, default vs tuned engine.
+
+    python benchmarks/bench_db_concurrency.py --readers 4 --writers 2 --duration 10
+
+Each profile gets its own copy of a seeded database. Reader processes page
+through articles while writer processes update article bodies (which also
+rewrites the FTS index and excerpt), the way several gunicorn workers share
+blog.db. The `default` profile is SQLite's stock rollback journal
+(journal_mode=DELETE, synchronous=FULL, 2 MB cache, no mmap); `tuned` is
+db.init_engine's defaults (WAL, synchronous=NORMAL, mmap, 64 MB cache).
+Reports throughput, p50/p95/p99 per operation and "database is locked" errors.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from common import make_app, percentiles, seed
+
+PROFILES = {
+    'default': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_CACHE_SIZE_KB': 2000,
+        'SQLITE_MMAP_SIZE': 0,
+    },
+    'tuned': {},
+}
+
+
+def worker(role, db_path, profile, duration, n_articles, seed_value, results):
+    from sqlalchemy.exc import OperationalError
+    from db import db
+    from models import Article
+
+    app = make_app(db_path, **PROFILES[profile])
+    rng = random.Random(seed_value)
+    latencies, locked = [], 0
+    with app.app_context():
+        stop_at = time.time() + duration
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                if role == 'read':
+                    page = rng.randrange(n_articles // 20)
+                    Article.query.order_by(Article.id.desc()).offset(page * 20).limit(20).all()
+                    Article.query.count()
+                else:
+                    article = db.session.get(Article, rng.randrange(1, n_articles + 1))
+                    article.body = f'<p>Edited {time.time()} {article.title}</p>' + article.body[:2000]
+                    db.session.commit()
+            except OperationalError as e:
+                db.session.rollback()
+                if 'locked' not in str(e):
+                    raise
+                locked += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+            db.session.remove()
+    results.put((role, latencies, locked))
+
+
+def run_profile(profile, seeded_path, tmp, args):
+    db_path = os.path.join(tmp, f'{profile}.db')
+    shutil.copy(seeded_path, db_path)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    roles = ['read'] * args.readers + ['write'] * args.writers
+    processes = [
+        ctx.Process(target=worker, args=(role, db_path, profile, args.duration, args.articles, i, results))
+        for i, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {'profile': profile}
+    for role in ('read', 'write'):
+        latencies = [ms for r, samples, _ in collected if r == role for ms in samples]
+        summary[role] = {
+            'ops_per_s': round(len(latencies) / args.duration, 1),
+            'locked_errors': sum(locked for r, _, locked in collected if r == role),
+            **percentiles(latencies or [0]),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    from db import db
+    from search import ensure_search_index
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded_path = os.path.join(tmp, 'seed.db')
+        app = make_app(seeded_path, SQLITE_JOURNAL_MODE='DELETE')
+        with app.app_context():
+            db.create_all()
+            ensure_search_index()
+            seed(n_articles=args.articles)
+            db.engine.dispose()
+
+        for profile in PROFILES:
+            summary = run_profile(profile, seeded_path, tmp, args)
+            results.append(summary)
+            for role in ('read', 'write'):
+                stats = summary[role]
+                print(f"{profile:<8} {role:<5} {stats['ops_per_s']:>8} ops/s  p50={stats['p50_ms']}ms "
+                      f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms locked={stats['locked_errors']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare the legacy `ilike('%q%')` article search with the FTS5 index.
+
+    python benchmarks/bench_search.py --articles 100000 --iterations 200
+
+Prints p50/p95/p99 latency (ms) per strategy for a set of typical
+search-as-you-type queries, at each requested table size.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from common import VOCABULARY, make_app, seed, time_calls
+
+from db import db
+from models import Article
+from search import ensure_search_index, matching_ids_clause, search_article_ids
+
+
+def run(sizes, iterations, per_page):
+    rng = random.Random(7)
+    queries = [rng.choice(VOCABULARY)[:rng.randint(3, 6)] for _ in range(50)]
+    results = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(os.path.join(tmp, 'bench.db'))
+            with app.app_context():
+                db.create_all()
+                ensure_search_index()
+                seed(n_articles=size)
+
+                def ilike():
+                    q = rng.choice(queries)
+                    Article.query.filter(Article.title.ilike(f"%{q}%")).paginate(
+                        page=1, per_page=per_page, error_out=False).items
+
+                def fts_filter():
+                    q = rng.choice(queries)
+                    Article.query.filter(matching_ids_clause(q)).paginate(
+                        page=1, per_page=per_page, error_out=False).items
+
+                def fts_ranked():
+                    q = rng.choice(queries)
+                    ids = search_article_ids(q, limit=per_page)
+                    Article.query.filter(Article.id.in_(ids)).all()
+
+                for name, fn in (('ilike', ilike), ('fts_filter', fts_filter), ('fts_ranked', fts_ranked)):
+                    stats = time_calls(fn, iterations)
+                    results.append({'articles': size, 'strategy': name, **stats})
+                    print(f"{size:>8} {name:<11} p50={stats['p50_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms")
+
+                db.session.remove()
+                db.engine.dispose()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = run(args.articles, args.iterations, args.per_page)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
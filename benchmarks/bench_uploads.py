@@ -0,0 +1,81 @@
+"""Thumbnail upload latency and peak memory: background vs inline variant encoding.
+
+    python benchmarks/bench_uploads.py --uploads 20 --size 3000
+
+Posts `--uploads` distinct PNG photos (`--size` pixels wide) to POST
+/api/categories with UPLOAD_BACKGROUND on and off, and reports request latency
+and the peak Python heap allocated while the request runs (tracemalloc).
+"""
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from common import make_app
+
+from flask_jwt_extended import create_access_token
+
+from db import db
+from uploads import uploads
+
+
+def make_image(width, seed_value):
+    from PIL import Image
+
+    # Noise compresses badly, like a real photo; the seed makes every upload distinct
+    image = Image.frombytes('RGB', (width, width * 2 // 3), os.urandom(width * (width * 2 // 3) * 3))
+    image.putpixel((0, 0), (seed_value % 256, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def run(background, images, tmp):
+    app = make_app(os.path.join(tmp, f'bg{int(background)}.db'), UPLOAD_BACKGROUND=background,
+                   MAX_CONTENT_LENGTH=64 * 1024 * 1024, UPLOAD_MAX_FILE_BYTES=64 * 1024 * 1024)
+    with app.app_context():
+        db.create_all()
+        token = create_access_token(identity='1')
+    client = app.test_client()
+
+    latencies, peaks = [], []
+    for i, data in enumerate(images):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.post('/api/categories', headers={'Authorization': f'Bearer {token}'},
+                               content_type='multipart/form-data',
+                               data={'title': f'C{i}', 'slug': f'c-{background}-{i}',
+                                     'thumbnail': (io.BytesIO(data), f'{i}.png')})
+        latencies.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 2 ** 20)
+        tracemalloc.stop()
+        assert response.status_code == 201, response.get_json()
+        if background:
+            # Drain between requests so the next one is not measured against a busy encoder
+            uploads._get_executor().submit(lambda: None).result()
+    return latencies, peaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uploads', type=int, default=20)
+    parser.add_argument('--size', type=int, default=3000, help='Image width in pixels')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.chdir(tmp)  # images.UPLOAD_FOLDER is relative to the working directory
+    images = [make_image(args.size, i) for i in range(args.uploads)]
+    print(f'{args.uploads} uploads of {statistics.mean(map(len, images)) / 2 ** 20:.1f} MB')
+
+    for background in (False, True):
+        latencies, peaks = run(background, images, tmp)
+        label = 'background' if background else 'inline'
+        print(f'{label:>10}: p50 {statistics.median(latencies):7.1f} ms  '
+              f'max {max(latencies):7.1f} ms  peak heap {statistics.median(peaks):6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
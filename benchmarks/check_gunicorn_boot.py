@@ -0,0 +1,75 @@
+"""Start gunicorn with each worker profile and the repo's default settings.
+
+    python benchmarks/check_gunicorn_boot.py [--profiles api ocr]
+
+Runs the documented production command (gunicorn -c gunicorn.conf.py
+wsgi:app) with an environment stripped down to PATH and HOME, only moving
+the bind address to a free local port, and waits for GET /metrics to answer
+200. Exits non-zero (and prints gunicorn's log) when a profile does not come
+up, e.g. because a default in gunicorn.conf.py needs a service or variable
+that a fresh deployment does not have.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT
+from load_test import free_port
+
+import requests
+
+BOOT_TIMEOUT = 60
+
+
+def check_profile(profile):
+    port = free_port()
+    env = {key: os.environ[key] for key in ('PATH', 'HOME') if key in os.environ}
+    env.update(WORKER_PROFILE=profile, GUNICORN_BIND=f'127.0.0.1:{port}')
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        reason = f'no answer within {BOOT_TIMEOUT}s'
+        deadline = time.time() + BOOT_TIMEOUT
+        while time.time() < deadline:
+            if process.poll() is not None:
+                reason = f'gunicorn exited with status {process.returncode}'
+                break
+            try:
+                if requests.get(f'http://127.0.0.1:{port}/metrics', timeout=2).status_code == 200:
+                    reason = None
+                    break
+            except requests.RequestException:
+                pass
+            time.sleep(0.3)
+
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.seek(0)
+        return reason, log.read().decode(errors='replace')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=['api', 'ocr'], choices=['api', 'ocr'])
+    args = parser.parse_args()
+
+    failures = []
+    for profile in args.profiles:
+        reason, log = check_profile(profile)
+        print(f"{profile:<5} {'FAIL  ' + reason if reason else 'ok'}", flush=True)
+        if reason:
+            print(log[-3000:])
+            failures.append(profile)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
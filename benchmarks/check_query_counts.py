@@ -0,0 +1,63 @@
+"""Guard against N+1 queries in the public listing endpoints.
+
+    python benchmarks/check_query_counts.py
+
+Requests every listing at several page sizes and reads X-SQL-Query-Count.
+The number of statements must not depend on how many rows are returned;
+exits non-zero (and prints the offenders) when it does.
+"""
+import os
+import sys
+import tempfile
+
+from common import make_app, seed
+
+from db import db
+from instrumentation import QUERY_COUNT_HEADER
+from models import SubCategory
+from search import ensure_search_index
+
+PAGE_SIZES = (1, 10, 50)
+
+LISTINGS = {
+    'articles': '/api/articles?per_page={n}',
+    'articles (cursor)': '/api/articles?paginate=cursor&per_page={n}',
+    'articles (search)': '/api/articles?search=flask&per_page={n}',
+    'articles/search': '/api/articles/search?q=flask&per_page={n}',
+    'subcategories (paged)': '/api/subcategories?limit={n}',
+    'categories/<slug>/articles': '/api/categories/category-1/articles?per_page={n}',
+    'subcategories/<slug>/articles': '/api/subcategories/sub-1/articles?per_page={n}',
+}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'check.db'))
+        with app.app_context():
+            db.create_all()
+            ensure_search_index()
+            seed(n_categories=20, n_articles=200, body_words=40)
+            for i in range(60):
+                db.session.add(SubCategory(title=f'Sub {i}', slug=f'sub-{i}', category_id=i % 20 + 1))
+            db.session.commit()
+
+        client = app.test_client()
+        failures = []
+        for name, url in LISTINGS.items():
+            counts = []
+            for n in PAGE_SIZES:
+                response = client.get(url.format(n=n))
+                counts.append(int(response.headers[QUERY_COUNT_HEADER]))
+            status = 'ok' if len(set(counts)) == 1 else 'N+1'
+            print(f"{name:<30} {counts} {status}")
+            if status != 'ok':
+                failures.append(name)
+
+        with app.app_context():
+            db.engine.dispose()
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
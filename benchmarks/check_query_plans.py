@@ -0,0 +1,110 @@
+"""Assert that the hot listing queries are served by indexes.
+
+    python benchmarks/check_query_plans.py
+
+Builds a database through the Alembic migrations (so the check covers what
+`flask db upgrade` actually creates), requests each listing, captures the SQL
+it runs and feeds the matching statement to EXPLAIN QUERY PLAN. A check fails
+when the plan does not use the expected index or sorts in a temporary B-tree;
+exits non-zero (and prints the plans) when any check fails.
+"""
+import os
+import sys
+import tempfile
+
+from common import make_app, seed
+
+from flask_migrate import upgrade
+from sqlalchemy import event, select, text
+
+from app import init_migrations
+from db import db
+from models import SubCategory
+
+# name -> (URL or statement factory, substring identifying the statement, expected index)
+CHECKS = {
+    'articles ?sort=published': ('/api/articles?sort=published', 'ORDER BY article.published_at', 'ix_article_published_at'),
+    'articles ?sort=created': ('/api/articles?sort=created', 'ORDER BY article.created_at', 'ix_article_created_at'),
+    'articles ?category_id': ('/api/articles?category_id=3', 'WHERE article.category_id', 'ix_article_category_id'),
+    'articles ?category_id&sort=published': (
+        '/api/articles?category_id=3&sort=published', 'WHERE article.category_id',
+        'ix_article_category_id_published_at'
+    ),
+    'categories/<slug>/articles': (
+        '/api/categories/category-3/articles?after=eyJrIjoxNTAwfQ', 'WHERE article.category_id', 'ix_article_category_id'
+    ),
+    'subcategories/<slug>/articles': (
+        '/api/subcategories/sub-3/articles', 'WHERE article.subcategory_id', 'ix_article_subcategory_id'
+    ),
+    'articles/latest': ('/api/articles/latest', 'ORDER BY article.published_at', 'ix_article_published_at'),
+    # Validators read only the three-row table_version (the planner may just scan it), never article itself
+    'articles ETag validator': ('/api/articles', 'FROM table_version', 'table_version'),
+    'categories ETag validator': ('/api/categories', 'FROM table_version', 'table_version'),
+    'subcategories by category': (
+        lambda: select(SubCategory.id).where(SubCategory.category_id == 3), 'sub_category.category_id',
+        'ix_sub_category_category_id'
+    ),
+}
+
+
+def capture_statements(client, url):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+
+def explain(statement, parameters):
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, tuple(parameters))
+    return [row[-1] for row in rows]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'plans.db'))
+        init_migrations(app)
+        client = app.test_client()
+        failures = []
+
+        with app.app_context():
+            upgrade()  # Includes the search index (0008_article_search)
+            seed(n_categories=20, n_articles=2000, body_words=40)
+            for i in range(60):
+                db.session.add(SubCategory(title=f'Sub {i}', slug=f'sub-{i}', category_id=i % 20 + 1))
+            db.session.commit()
+            db.session.execute(text('ANALYZE'))  # Plans as the planner sees a populated table
+
+            for name, (target, marker, index) in CHECKS.items():
+                if callable(target):
+                    compiled = target().compile(db.engine)
+                    statements = [(str(compiled), tuple(compiled.params[key] for key in compiled.positiontup))]
+                else:
+                    statements = capture_statements(client, target)
+
+                matching = [(sql, params) for sql, params in statements if marker in sql]
+                if not matching:
+                    print(f"{name:<40} FAIL  no statement containing {marker!r}")
+                    failures.append(name)
+                    continue
+
+                plan = explain(*matching[0])
+                plan_text = ' | '.join(plan)
+                ok = index in plan_text and 'TEMP B-TREE' not in plan_text
+                print(f"{name:<40} {'ok' if ok else 'FAIL':<5} {plan_text}")
+                if not ok:
+                    failures.append(name)
+
+            db.engine.dispose()
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Allow `python benchmarks/<script>.py` from the repo root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from flask import Flask
+from flask_jwt_extended import JWTManager
+
+from config import Config
+from db import db, init_engine
+from instrumentation import init_query_counter
+from models import Article, Category, SubCategory, make_excerpt, refresh_article_counts
+from uploads import uploads
+
+WORDS = (
+    "flask api blog article python sqlite index query search cache server worker "
+    "image upload thumbnail category content editor draft publish review release "
+    "performance latency throughput memory network database table column engine "
+    "khmer english translate speech text ocr export report benchmark profile"
+).split()
+
+# A realistic corpus has a long tail of rare words; without it every search term
+# matches most of the table and no index can help.
+_SYLLABLES = 'ka lo mi ne ra su ti vo ze ba ch de fu gi ho ja ku le ma no pa qu re sa to'.split()
+VOCABULARY = WORDS + [a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES]
+
+
+def make_app(db_path, **config):
+    """Minimal app with the content blueprints, backed by `db_path` (`config` overrides Config)."""
+    from routes import routes_bp
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(db_path)
+    app.config['SQL_QUERY_COUNT_HEADER'] = True
+    app.config.update(config)
+    init_engine(app)
+    JWTManager(app)
+    init_query_counter(app)
+    uploads.init_app(app)
+    app.register_blueprint(routes_bp, url_prefix='/api')
+    return app
+
+
+def random_word(rng):
+    # Zipf-like: common words dominate, rare words make searches selective
+    return VOCABULARY[min(int(rng.paretovariate(1.1)) - 1, len(VOCABULARY) - 1)] \
+        if rng.random() < 0.5 else rng.choice(VOCABULARY)
+
+
+def random_sentence(rng, n_words):
+    return ' '.join(random_word(rng) for _ in range(n_words)).capitalize() + '.'
+
+
+def seed(n_categories=10, n_articles=1000, body_words=400, seed_value=42, batch=5000,
+         subcategories_per_category=0, body_sigma=0.0, spread_days=0):
+    """Insert synthetic categories and articles (call inside an app context).
+
+    `body_sigma` > 0 draws body lengths from a log-normal around `body_words`
+    (a few long posts, many short ones); `spread_days` > 0 spreads publication
+    dates over that many days. Same arguments, same data.
+    """
+    rng = random.Random(seed_value)
+
+    categories = [Category(title=f'Category {i}', slug=f'category-{i}') for i in range(n_categories)]
+    db.session.add_all(categories)
+    db.session.commit()
+    category_ids = [c.id for c in categories]
+
+    subcategories = [SubCategory(title=f'Subcategory {i}-{j}', slug=f'subcategory-{i}-{j}', category_id=category_id)
+                     for i, category_id in enumerate(category_ids) for j in range(subcategories_per_category)]
+    db.session.add_all(subcategories)
+    db.session.commit()
+    children = {}
+    for subcategory in subcategories:
+        children.setdefault(subcategory.category_id, []).append(subcategory.id)
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    rows = []
+    for i in range(n_articles):
+        words = body_words if not body_sigma else \
+            min(max(int(rng.lognormvariate(math.log(body_words), body_sigma)), 24), body_words * 20)
+        body = '<p>' + ' '.join(random_sentence(rng, 12) for _ in range(words // 12)) + '</p>'
+        category_id = rng.choice(category_ids)
+        row = {
+            'title': random_sentence(rng, 8),
+            'slug': f'article-{i}',
+            'body': body,
+            'excerpt': make_excerpt(body),  # Core inserts skip the ORM hook
+            'category_id': category_id,
+        }
+        if children.get(category_id) and rng.random() < 0.7:
+            row['subcategory_id'] = rng.choice(children[category_id])
+        if spread_days:
+            row['published_at'] = row['created_at'] = now - timedelta(seconds=rng.randrange(spread_days * 86400))
+        rows.append(row)
+        if len(rows) >= batch:
+            _insert_articles(rows)
+            rows = []
+    if rows:
+        _insert_articles(rows)
+    refresh_article_counts()
+    db.session.commit()
+
+
+def _insert_articles(rows):
+    # executemany needs the same keys in every row
+    for row in rows:
+        row.setdefault('subcategory_id', None)
+    db.session.execute(db.insert(Article), rows)
+    db.session.commit()
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(pick(50), 3),
+        'p95_ms': round(pick(95), 3),
+        'p99_ms': round(pick(99), 3),
+    }
+
+
+def time_calls(fn, iterations, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
@@ -0,0 +1,75 @@
+"""Compare two suite.py result files, case by case.
+
+    python benchmarks/compare.py before.json after.json [--threshold 10]
+
+Prints p50/p95 and throughput for every case both runs have, and exits with
+status 1 when a case's p95 got more than --threshold percent (and more than
+--min-ms) slower, so it can gate CI. Runs on different datasets, corpora or
+machines are compared anyway, with a warning.
+"""
+import argparse
+import json
+import sys
+
+COMPARABLE = ('dataset', 'ocr_corpus', 'cpus', 'python')
+
+
+def change(before, after):
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(before, after, threshold, min_ms):
+    regressions = []
+    for mode in sorted(set(before['results']) & set(after['results'])):
+        print(f'\n{mode}:')
+        print(f"  {'case':<30} {'p50 ms':>19} {'p95 ms':>28} {'req/s':>22}")
+        old_cases, new_cases = before['results'][mode], after['results'][mode]
+        for name in sorted(set(old_cases) & set(new_cases)):
+            old, new = old_cases[name], new_cases[name]
+            if not old['requests'] or not new['requests']:
+                print(f'  {name:<30} no requests in one of the runs')
+                continue
+            p95_change = change(old['p95_ms'], new['p95_ms'])
+            regressed = p95_change is not None and p95_change > threshold and new['p95_ms'] - old['p95_ms'] > min_ms
+            if regressed:
+                regressions.append(f'{mode}/{name}')
+            print(f"  {name:<30} {old['p50_ms']:>8.2f} → {new['p50_ms']:>8.2f}  "
+                  f"{old['p95_ms']:>8.2f} → {new['p95_ms']:>8.2f} ({p95_change or 0:+6.1f}%)  "
+                  f"{old['requests_per_s']:>8} → {new['requests_per_s']:>8}"
+                  f"{'  ⚠️ slower' if regressed else ''}")
+        for label, names in (('before', set(old_cases) - set(new_cases)), ('after', set(new_cases) - set(old_cases))):
+            if names:
+                print(f"  Only in {label}: {', '.join(sorted(names))}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help='Allowed p95 slowdown, in percent')
+    parser.add_argument('--min-ms', type=float, default=1, help='Ignore p95 slowdowns smaller than this')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta']['commit']}{' (dirty)' if before['meta']['dirty'] else ''}  "
+          f"after: {after['meta']['commit']}{' (dirty)' if after['meta']['dirty'] else ''}")
+    for key in COMPARABLE:
+        if before['meta'].get(key) != after['meta'].get(key):
+            print(f"⚠️ {key} differs ({before['meta'].get(key)} vs {after['meta'].get(key)}): timings may not be comparable")
+
+    regressions = compare(before, after, args.threshold, args.min_ms)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed beyond {args.threshold}% p95: {', '.join(regressions)}")
+        sys.exit(1)
+    print('\nNo p95 regressions.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Measure app start-up cost with `python -X importtime`.
+
+    python benchmarks/importtime.py                 # default FEATURES
+    python benchmarks/importtime.py --features ""   # core API only
+    python benchmarks/importtime.py --json importtime.json
+
+Runs `create_app()` in a fresh interpreter (a few times, best run kept) and
+reports the wall time plus the top-level imports that dominate it. Heavy
+clients (requests, googletrans, Pillow, tesseract, gTTS) should not show up
+here: they are imported on first use.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import ROOT
+
+SNIPPET = "from app import create_app; create_app()"
+HEAVY = ('requests', 'googletrans', 'httpx', 'PIL', 'pytesseract', 'gtts', 'fpdf', 'docx')
+
+
+def run_once(env):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SNIPPET],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    """{module: (self_us, cumulative_us, depth)} from -X importtime stderr."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_part, cumulative_us, name = line.split('|')
+        self_us = int(self_part.split(':')[1])
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (self_us, int(cumulative_us), depth)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--features', help='FEATURES for the app (default: config default)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('OCR_CACHE_PATH', '')
+    env.setdefault('TTS_PREGENERATE', '0')
+    if args.features is not None:
+        env['FEATURES'] = args.features
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    wall_ms, modules = min(runs, key=lambda run: run[0])
+
+    top_level = sorted(
+        ((name, cumulative) for name, (_, cumulative, depth) in modules.items() if depth == 1),
+        key=lambda item: item[1], reverse=True
+    )
+    total_us = sum(cumulative for _, cumulative in top_level)
+    result = {
+        'features': env.get('FEATURES', 'default'),
+        'wall_ms': round(wall_ms, 1),
+        'imports_ms': round(total_us / 1000, 1),
+        'modules_loaded': len(modules),
+        'heavy_loaded': sorted(name for name in modules if name in HEAVY),
+        'top_imports_ms': {name: round(us / 1000, 1) for name, us in top_level[:args.top]},
+    }
+
+    print(f"create_app(): {result['wall_ms']}ms wall, {result['imports_ms']}ms in imports, "
+          f"{result['modules_loaded']} modules")
+    print(f"heavy dependencies loaded at start-up: {', '.join(result['heavy_loaded']) or 'none'}")
+    for name, ms in result['top_imports_ms'].items():
+        print(f"  {ms:>8.1f}ms  {name}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
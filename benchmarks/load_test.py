@@ -0,0 +1,169 @@
+"""Load-test the production server (gunicorn + wsgi:app) per worker profile.
+
+    python benchmarks/load_test.py --profiles api ocr --duration 15 --concurrency 32
+
+For each profile a gunicorn instance is started from gunicorn.conf.py against
+a freshly seeded SQLite database, hammered by `--concurrency` client threads
+for `--duration` seconds, then stopped. Reports requests/s and p50/p95/p99 per
+profile; `--json` writes the raw results.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from common import ROOT, make_app, percentiles, seed
+
+from db import db
+from search import ensure_search_index
+
+# Requests each profile is expected to serve (see gunicorn.conf.py)
+MIXES = {
+    'api': [
+        ('GET', '/api/categories', None),
+        ('GET', '/api/subcategories', None),
+        ('GET', '/api/articles?per_page=10&page={page}', None),
+        ('GET', '/api/articles?paginate=cursor&per_page=10&fields=summary', None),
+        ('GET', '/api/articles/latest', None),
+        ('GET', '/api/articles/article-{article}', None),
+        ('GET', '/api/articles/search?q={word}', None),
+    ],
+    'ocr': [
+        ('POST', '/api/ocr/export', {'type': 'pdf', 'text': 'Lorem ipsum dolor sit amet.\n' * 400}),
+        ('POST', '/api/ocr/export', {'type': 'docx', 'text': 'Lorem ipsum dolor sit amet.\n' * 400}),
+        ('POST', '/api/ocr/export', {'type': 'txt', 'text': 'Lorem ipsum dolor sit amet.\n' * 400}),
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(profile, db_path, port, extra_env):
+    env = dict(os.environ, **extra_env)
+    env.update({
+        'WORKER_PROFILE': profile,
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_ACCESSLOG': '',
+        'DATABASE_URL': 'sqlite:///' + db_path,
+        'OCR_CACHE_PATH': os.path.join(os.path.dirname(db_path), 'ocr_cache.db'),
+        'TTS_CACHE_DIR': os.path.join(os.path.dirname(db_path), 'tts_cache'),
+        'GEMINI_API_KEY': env.get('GEMINI_API_KEY', 'load-test'),
+        'TTS_PREGENERATE': '0',
+    })
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/api/categories', timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'gunicorn ({profile}) did not start: {process.stderr.read().decode()[-2000:]}')
+
+
+def drive(base_url, mix, duration, concurrency, n_articles):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(seed_value):
+        rng = random.Random(seed_value)
+        session = requests.Session()
+        local, failed = [], 0
+        while time.time() < stop_at:
+            method, path, body = rng.choice(mix)
+            url = base_url + path.format(page=rng.randint(1, 50), article=rng.randrange(n_articles),
+                                         word=rng.choice(['flask', 'api', 'sqlite', 'index']))
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, json=body, timeout=30)
+                failed += response.status_code >= 500
+            except requests.RequestException:
+                failed += 1
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        **percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', default=['api', 'ocr'], choices=sorted(MIXES))
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--cache', default='local', choices=['local', 'null'], help='CACHE_TYPE for the server')
+    parser.add_argument('--workers', help='override GUNICORN_WORKERS')
+    parser.add_argument('--threads', help='override GUNICORN_THREADS')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    extra_env = {'CACHE_TYPE': args.cache}
+    if args.workers:
+        extra_env['GUNICORN_WORKERS'] = args.workers
+    if args.threads:
+        extra_env['GUNICORN_THREADS'] = args.threads
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'load.db')
+        app = make_app(db_path)
+        with app.app_context():
+            db.create_all()
+            ensure_search_index()
+            seed(n_articles=args.articles)
+            db.engine.dispose()
+
+        for profile in args.profiles:
+            port = free_port()
+            process = start_server(profile, db_path, port, extra_env)
+            try:
+                stats = drive(f'http://127.0.0.1:{port}', MIXES[profile], args.duration,
+                              args.concurrency, args.articles)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            stats = {'profile': profile, 'cpus': os.cpu_count(), 'cache': args.cache,
+                     'concurrency': args.concurrency, **stats}
+            results.append(stats)
+            print(f"{profile:<4} {stats['requests_per_s']:>8} req/s  p50={stats['p50_ms']}ms "
+                  f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms errors={stats['errors']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
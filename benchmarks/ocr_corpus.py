@@ -0,0 +1,50 @@
+"""Fixed OCR image corpus, rendered from a seed instead of checked-in binaries.
+
+The same seed gives the same text and layout; the pixels depend only on the
+Pillow version, so `corpus_digest()` is stored with every benchmark result to
+tell whether two runs OCR'd the same images.
+"""
+import hashlib
+import io
+import random
+
+from common import random_sentence
+
+# name -> (width, height, lines of text, font size)
+DOCUMENTS = {
+    'receipt': (600, 900, 24, 22),
+    'letter': (1240, 1754, 48, 28),
+    'screenshot': (1280, 720, 16, 24),
+}
+
+
+def render(name, seed_value=1234):
+    """PNG bytes of one corpus document: black text on a white page."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height, lines, size = DOCUMENTS[name]
+    rng = random.Random(f'{seed_value}:{name}')
+    image = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=size)
+    margin, step = size * 2, int(size * 1.5)
+    for line in range(lines):
+        y = margin + line * step
+        if y + step > height - margin:
+            break
+        draw.text((margin, y), random_sentence(rng, rng.randint(4, 9)), fill=0, font=font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=False)
+    return buffer.getvalue()
+
+
+def load_corpus(seed_value=1234):
+    return {name: render(name, seed_value) for name in DOCUMENTS}
+
+
+def corpus_digest(corpus):
+    sha256 = hashlib.sha256()
+    for name in sorted(corpus):
+        sha256.update(name.encode() + corpus[name])
+    return sha256.hexdigest()[:16]
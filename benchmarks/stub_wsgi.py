@@ -0,0 +1,11 @@
+"""wsgi:app with the third-party stubs installed, for benchmark servers.
+
+    gunicorn -c gunicorn.conf.py --pythonpath benchmarks stub_wsgi:app
+
+Set GEMINI_API_BASE to a running stubs.GeminiStub and STUB_LATENCY_MS as for
+the in-process run.
+"""
+from stubs import install_stubs
+from wsgi import app
+
+install_stubs()
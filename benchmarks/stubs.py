@@ -0,0 +1,109 @@
+"""Stand-ins for the third-party backends, so benchmarks never leave the machine.
+
+Gemini is a real HTTP server on localhost (GEMINI_API_BASE points at it), so
+requests still go through the shared outbound client: pooling, timeouts,
+breaker and all. gTTS and googletrans have no configurable endpoint, so their
+calls are replaced in-process by `install_stubs()`. Each stub answers after a
+fixed STUB_LATENCY_MS, which keeps runs comparable.
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# One silent MPEG-1 Layer III frame (128 kbit/s, 44.1 kHz): a valid MP3 for any player
+SILENT_MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+
+def stub_latency():
+    return float(os.getenv('STUB_LATENCY_MS', 50)) / 1000
+
+
+class _GeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = body.get('contents', [{}])[0].get('parts', [{}])[0].get('text', '')
+        answer = f'Stub answer for a {len(prompt)}-character prompt. ' * 4
+        time.sleep(self.server.latency)
+
+        if ':streamGenerateContent' in self.path:
+            # Five SSE chunks spread over the latency again, like a generation in progress
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for word in answer.split('. ')[:5]:
+                event = json.dumps({'candidates': [{'content': {'parts': [{'text': word + '. '}]}}]})
+                self._chunk(f'data: {event}\r\n\r\n'.encode())
+                time.sleep(self.server.latency / 5)
+            self._chunk(b'')
+            return
+
+        payload = json.dumps({'candidates': [{'content': {'parts': [{'text': answer}]}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+
+class GeminiStub:
+    """Serves generateContent / streamGenerateContent on 127.0.0.1 from a background thread."""
+
+    def __init__(self, latency=None):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _GeminiHandler)
+        self.server.daemon_threads = True
+        self.server.latency = stub_latency() if latency is None else latency
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Translated:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubTranslator:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def translate(self, text, dest='en'):
+        time.sleep(self.latency)
+        return _Translated(f'[{dest}] {text}')
+
+
+def install_stubs(latency=None):
+    """Replace gTTS synthesis and the googletrans client in this process."""
+    import tts_audio
+
+    latency = stub_latency() if latency is None else latency
+
+    def synthesize_piece(text, lang, timeout=None):
+        time.sleep(latency)
+        # Roughly one frame per 5 characters, so longer texts give longer files
+        return SILENT_MP3_FRAME * max(1, len(text) // 5)
+
+    tts_audio._synthesize_piece = synthesize_piece
+    try:
+        import routes.image_ocr
+    except ImportError:
+        return  # OCR feature dependencies missing: nothing to translate
+    routes.image_ocr._translator = StubTranslator(latency)
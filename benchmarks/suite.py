@@ -0,0 +1,778 @@
+"""Per-route benchmark of the whole API: in-process and through gunicorn.
+
+    python benchmarks/suite.py --json results/$(git rev-parse --short HEAD).json
+    python benchmarks/compare.py results/before.json results/after.json
+
+Builds a synthetic dataset once (categories, subcategories and --articles
+articles with log-normal body lengths), keyed by its parameters and the
+schema, and reuses it from --data-dir. Every run starts from a fresh copy.
+Each case (one or more per route in routes/) is then timed:
+
+  client  through Flask's test client, one request at a time: the cost of
+          the code itself, no network or server in the way
+  server  through gunicorn (gunicorn.conf.py, the `api` profile by default)
+          with --concurrency client threads for --duration seconds per case
+
+Gemini, gTTS and googletrans are replaced by local stubs answering after
+--stub-latency ms (see stubs.py), and OCR reads a fixed rendered corpus
+(ocr_corpus.py). The OCR routes are skipped when tesseract is not installed.
+Results go to stdout and, with --json, to a file for compare.py. Routes
+without a case are listed under "uncovered".
+"""
+import argparse
+import hashlib
+import importlib.util
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from datetime import datetime, timezone
+
+from common import ROOT, VOCABULARY, make_app, percentiles, random_sentence, seed
+from load_test import free_port
+from ocr_corpus import corpus_digest, load_corpus
+from stubs import SILENT_MP3_FRAME, GeminiStub, install_stubs
+
+import requests
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+from db import db
+from models import Admin, Article, Category, OcrJob, OcrJobItem, SubCategory, refresh_article_counts
+from search import ensure_search_index
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ADMIN = ('bench-admin', 'bench-password')
+
+
+class Exhausted(Exception):
+    """A case ran out of rows to consume (e.g. articles to delete)."""
+
+
+Case = namedtuple('Case', 'name endpoint build needs pool')
+CASES = []
+
+
+def case(name, endpoint, needs=None, pool=None):
+    def register(build):
+        CASES.append(Case(name, endpoint, build, needs, pool))
+        return build
+    return register
+
+
+def call(method, path, auth=False, json=None, form=None, files=None, body=None, content_type=None, headers=None):
+    return {'method': method, 'path': path, 'auth': auth, 'json': json, 'form': form, 'files': files,
+            'body': body, 'content_type': content_type, 'headers': headers or {}}
+
+
+# 📚 Content reads
+
+@case('articles.page', 'routes.article.get_articles')
+def _(fx, rng):
+    return call('GET', f'/api/articles?per_page=10&page={rng.randint(1, 50)}')
+
+
+@case('articles.page_deep', 'routes.article.get_articles')
+def _(fx, rng):
+    return call('GET', f'/api/articles?per_page=10&page={rng.randint(1, fx.articles // 10)}')
+
+
+@case('articles.cursor_summary', 'routes.article.get_articles')
+def _(fx, rng):
+    return call('GET', '/api/articles?paginate=cursor&per_page=20&fields=summary')
+
+
+@case('articles.by_category_sorted', 'routes.article.get_articles')
+def _(fx, rng):
+    return call('GET', f'/api/articles?category_id={rng.choice(fx.category_ids)}&sort=published&per_page=10')
+
+
+@case('articles.list_search', 'routes.article.get_articles')
+def _(fx, rng):
+    return call('GET', f'/api/articles?search={rng.choice(fx.words)}&per_page=10')
+
+
+@case('articles.search', 'routes.article.search_articles')
+def _(fx, rng):
+    return call('GET', f'/api/articles/search?q={rng.choice(fx.words)}')
+
+
+@case('articles.by_slug', 'routes.article.get_article_by_slug')
+def _(fx, rng):
+    return call('GET', f'/api/articles/article-{rng.randrange(fx.articles)}')
+
+
+@case('articles.latest', 'routes.article.get_latest_articles')
+def _(fx, rng):
+    return call('GET', '/api/articles/latest')
+
+
+@case('categories.list', 'routes.category.get_categories')
+def _(fx, rng):
+    return call('GET', '/api/categories')
+
+
+@case('categories.articles', 'routes.article.get_category_articles')
+def _(fx, rng):
+    return call('GET', f'/api/categories/{rng.choice(fx.category_slugs)}/articles?per_page=20')
+
+
+@case('subcategories.list', 'routes.subcategory.get_subcategories')
+def _(fx, rng):
+    return call('GET', '/api/subcategories')
+
+
+@case('subcategories.list_paged', 'routes.subcategory.get_subcategories')
+def _(fx, rng):
+    return call('GET', '/api/subcategories?limit=20')
+
+
+@case('subcategories.articles', 'routes.article.get_subcategory_articles')
+def _(fx, rng):
+    return call('GET', f'/api/subcategories/{rng.choice(fx.subcategory_slugs)}/articles?per_page=20')
+
+
+@case('dashboard.stats', 'dashboard.get_dashboard_stats')
+def _(fx, rng):
+    return call('GET', '/api/dashboard-stats', auth=True)
+
+
+@case('dashboard.outbound', 'dashboard.get_outbound_stats')
+def _(fx, rng):
+    return call('GET', '/api/dashboard-stats/outbound', auth=True)
+
+
+@case('bulk.export_subcategories', 'routes.bulk.bulk_export')
+def _(fx, rng):
+    return call('GET', '/api/bulk/subcategories?format=csv', auth=True)
+
+
+# ✏️ Content writes (each run works on its own copy of the dataset)
+
+@case('articles.create', 'routes.article.create_article')
+def _(fx, rng):
+    return call('POST', '/api/articles', auth=True, form=fx.article_form(rng))
+
+
+@case('articles.create_thumbnail', 'routes.article.create_article')
+def _(fx, rng):
+    return call('POST', '/api/articles', auth=True, form=fx.article_form(rng),
+                files={'thumbnail': ('photo.jpg', fx.photo)})
+
+
+@case('articles.update', 'routes.article.update_article')
+def _(fx, rng):
+    return call('PUT', f'/api/articles/{rng.randrange(1, fx.articles + 1)}', auth=True,
+                form={'title': random_sentence(rng, 8)})
+
+
+@case('articles.delete', 'routes.article.delete_article', pool='article')
+def _(fx, rng):
+    return call('DELETE', f'/api/articles/{fx.take("article")}', auth=True)
+
+
+@case('categories.create', 'routes.category.create_category')
+def _(fx, rng):
+    return call('POST', '/api/categories', auth=True, form={'title': 'Bench', 'slug': fx.unique('category')})
+
+
+@case('categories.update', 'routes.category.update_category')
+def _(fx, rng):
+    return call('PUT', f'/api/categories/{rng.choice(fx.category_ids)}', auth=True,
+                form={'title': random_sentence(rng, 3)})
+
+
+@case('categories.delete', 'routes.category.delete_category', pool='category')
+def _(fx, rng):
+    return call('DELETE', f'/api/categories/{fx.take("category")}', auth=True)
+
+
+@case('subcategories.create', 'routes.subcategory.create_subcategory')
+def _(fx, rng):
+    return call('POST', '/api/subcategories', auth=True,
+                form={'title': 'Bench', 'slug': fx.unique('subcategory'), 'category_id': rng.choice(fx.category_ids)})
+
+
+@case('subcategories.update', 'routes.subcategory.update_subcategory')
+def _(fx, rng):
+    return call('PUT', f'/api/subcategories/{rng.choice(fx.subcategory_ids)}', auth=True,
+                form={'title': random_sentence(rng, 3)})
+
+
+@case('subcategories.delete', 'routes.subcategory.delete_subcategory', pool='subcategory')
+def _(fx, rng):
+    return call('DELETE', f'/api/subcategories/{fx.take("subcategory")}', auth=True)
+
+
+@case('bulk.import_100_articles', 'routes.bulk.bulk_import')
+def _(fx, rng):
+    lines = [json.dumps({'title': random_sentence(rng, 8), 'slug': fx.unique('bulk'), 'category': rng.choice(fx.category_slugs),
+                         'body': '<p>' + ' '.join(random_sentence(rng, 12) for _ in range(40)) + '</p>'})
+             for _ in range(100)]
+    return call('POST', '/api/bulk/articles', auth=True, body='\n'.join(lines).encode(),
+                content_type='application/x-ndjson')
+
+
+# 🤖 Third-party backed (stubbed)
+
+@case('gemini.cached', 'gemini.generate_gemini_response')
+def _(fx, rng):
+    return call('POST', '/api/gemini', json={'prompt': f'Summarise article {rng.randrange(10)} in one sentence.'})
+
+
+@case('gemini.upstream', 'gemini.generate_gemini_response')
+def _(fx, rng):
+    return call('POST', '/api/gemini', json={'prompt': f'Write a title for draft {fx.unique("prompt")}.'})
+
+
+@case('gemini.stream', 'gemini.stream_gemini_response')
+def _(fx, rng):
+    return call('POST', '/api/gemini/stream', json={'prompt': f'Write an intro for draft {fx.unique("prompt")}.'})
+
+
+@case('tts.synthesize', 'tts.text_to_speech')
+def _(fx, rng):
+    return call('POST', '/api/tts', json={'text': f'{random_sentence(rng, 30)} {fx.unique("speech")}', 'lang': 'en'})
+
+
+@case('tts.article', 'tts.article_audio')
+def _(fx, rng):
+    return call('GET', f'/api/tts/articles/article-{rng.randrange(200)}')
+
+
+@case('tts.cached_audio', 'tts.get_cached_audio')
+def _(fx, rng):
+    return call('GET', f'/api/tts/audio/{fx.audio_key}.mp3')
+
+
+@case('ocr.image_translate', 'ocr.image_to_text', needs='tesseract')
+def _(fx, rng):
+    name = rng.choice(sorted(fx.corpus))
+    return call('POST', '/api/ocr', form={'lang': 'eng', 'translate_to': 'km'},
+                files={'image': (f'{name}.png', fx.corpus[name])})
+
+
+@case('ocr.bulk_3_images', 'ocr.bulk_ocr', needs='tesseract')
+def _(fx, rng):
+    return call('POST', '/api/ocr/bulk', form={'lang': 'eng'},
+                files=[('images', (f'{name}.png', data)) for name, data in sorted(fx.corpus.items())])
+
+
+@case('ocr.job_create', 'ocr.create_ocr_job', needs='tesseract')
+def _(fx, rng):
+    return call('POST', '/api/ocr/jobs', form={'lang': 'eng'},
+                files=[('images', (f'{name}.png', data)) for name, data in sorted(fx.corpus.items())])
+
+
+@case('ocr.job_status', 'ocr.get_ocr_job')
+def _(fx, rng):
+    return call('GET', f'/api/ocr/jobs/{fx.job_id}')
+
+
+@case('ocr.export_txt', 'ocr.export_text')
+def _(fx, rng):
+    return call('POST', '/api/ocr/export', json={'type': 'txt', 'text': fx.ocr_text})
+
+
+@case('ocr.export_pdf', 'ocr.export_text')
+def _(fx, rng):
+    return call('POST', '/api/ocr/export', json={'type': 'pdf', 'text': fx.ocr_text})
+
+
+@case('ocr.export_docx', 'ocr.export_text')
+def _(fx, rng):
+    return call('POST', '/api/ocr/export', json={'type': 'docx', 'text': fx.ocr_text})
+
+
+# 🔧 Operations
+
+@case('profiles.list', 'profiles.list_profiles')
+def _(fx, rng):
+    return call('GET', '/api/profiles', auth=True)
+
+
+@case('profiles.get', 'profiles.get_profile')
+def _(fx, rng):
+    return call('GET', f'/api/profiles/{fx.profile_id}', auth=True)
+
+
+@case('profiles.download', 'profiles.download_profile')
+def _(fx, rng):
+    return call('GET', f'/api/profiles/{fx.profile_id}.collapsed', auth=True)
+
+
+@case('metrics', 'metrics')
+def _(fx, rng):
+    return call('GET', '/metrics')
+
+
+@case('auth.login', 'auth.login')
+def _(fx, rng):
+    return call('POST', '/auth/login', json={'username': ADMIN[0], 'password': ADMIN[1]})
+
+
+@case('auth.register', 'auth.register')
+def _(fx, rng):
+    return call('POST', '/auth/register', json={'username': fx.unique('user'), 'password': 'bench-password'})
+
+
+class Fixture:
+    """Rows, files and ids the cases need, for one database copy."""
+
+    def __init__(self, label, articles, corpus):
+        self.label = label
+        self.articles = articles
+        self.corpus = corpus
+        # Common words match thousands of articles, the long tail a handful
+        self.words = VOCABULARY[:10] + random.Random(7).sample(VOCABULARY, 30)
+        self.ocr_text = '\n'.join(random_sentence(random.Random(5), 12) for _ in range(600))
+        self.token = None
+        self.pools = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.photo = _photo()
+
+    def unique(self, prefix):
+        return f'bench-{self.label}-{prefix}-{next(self._counter)}'
+
+    def take(self, kind):
+        with self._lock:
+            if not self.pools[kind]:
+                raise Exhausted(kind)
+            return self.pools[kind].popleft()
+
+    def fill(self, kind, count):
+        """Insert `count` throwaway rows for a delete case to consume.
+
+        Filled right before the case runs, so they never show up in the
+        listings measured earlier.
+        """
+        model = {'article': Article, 'category': Category, 'subcategory': SubCategory}[kind]
+        rows = [{'title': 'Throwaway', 'slug': self.unique(kind)} for _ in range(count)]
+        for row in rows:
+            if model is Article:
+                row.update(body='<p>Throwaway article.</p>', excerpt='Throwaway article.')
+            if model is not Category:
+                row['category_id'] = self.category_ids[0]
+        with self.app.app_context():
+            db.session.execute(db.insert(model), rows)
+            refresh_article_counts()
+            db.session.commit()
+            slugs = [row['slug'] for row in rows]
+            ids = db.session.query(model.id).filter(model.slug.in_(slugs)).order_by(model.id)
+            self.pools[kind] = deque(id for (id,) in ids)
+            db.engine.dispose()  # Leave the database to the app under test
+
+    def article_form(self, rng):
+        body = '<p>' + ' '.join(random_sentence(rng, 12) for _ in range(40)) + '</p>'
+        return {'title': random_sentence(rng, 8), 'slug': self.unique('article'), 'body': body,
+                'category_id': str(rng.choice(self.category_ids))}
+
+    def prepare(self, app, tts_dir, profile_dir):
+        """Admin, OCR job, cached audio and a stored profile; call before the run, on this copy."""
+        from flask_jwt_extended import create_access_token
+        from profiling import store
+        from tts_audio import audio_key
+
+        self.app = app
+        with app.app_context():
+            self.category_ids = [id for (id,) in db.session.query(Category.id).order_by(Category.id)]
+            self.category_slugs = [slug for (slug,) in db.session.query(Category.slug).order_by(Category.id)]
+            self.subcategory_ids = [id for (id,) in db.session.query(SubCategory.id).order_by(SubCategory.id)]
+            self.subcategory_slugs = [slug for (slug,) in db.session.query(SubCategory.slug).order_by(SubCategory.id)]
+
+            if Admin.query.filter_by(username=ADMIN[0]).first() is None:
+                db.session.add(Admin(username=ADMIN[0], password=generate_password_hash(ADMIN[1])))
+            job = OcrJob(id=hashlib.md5(self.label.encode()).hexdigest(), lang='eng', total=3, status='done',
+                         completed=3, failed=0)
+            job.items = [OcrJobItem(position=i, filename=f'{i}.png', status='done', text=self.ocr_text[:500])
+                         for i in range(3)]
+            db.session.merge(job)
+            db.session.commit()
+            self.job_id = job.id
+            self.token = create_access_token(identity=ADMIN[0])
+            db.engine.dispose()
+
+        os.makedirs(tts_dir, exist_ok=True)
+        self.audio_key = audio_key('Benchmark audio.', 'en')
+        with open(os.path.join(tts_dir, f'{self.audio_key}.mp3'), 'wb') as f:
+            f.write(SILENT_MP3_FRAME * 2000)
+
+        store.configure(profile_dir, 50)
+        self.profile_id = store.save({'method': 'GET', 'path': '/api/articles', 'endpoint': 'routes.article.get_articles',
+                                      'status': 200, 'duration_ms': 1.0, 'mode': 'stack', 'samples': 3},
+                                     stacks=Counter({'wsgi_app (flask/app.py:1);get_articles (routes/article.py:1)': 3}))
+
+
+def _photo():
+    from PIL import Image
+
+    # A 1600px photo-like JPEG: noise compresses like a real picture
+    rng = random.Random(99)
+    image = Image.frombytes('RGB', (160, 120), bytes(rng.randrange(256) for _ in range(160 * 120 * 3)))
+    buffer = io.BytesIO()
+    image.resize((1600, 1200)).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+# 🗄️ Dataset
+
+def dataset_key(args):
+    sha256 = hashlib.sha256(json.dumps([args.articles, args.categories, args.subcategories, args.body_words,
+                                        args.seed]).encode())
+    # A schema change invalidates the cached dataset
+    for name in ('models.py', 'search.py'):
+        with open(os.path.join(ROOT, name), 'rb') as f:
+            sha256.update(f.read())
+    return sha256.hexdigest()[:12]
+
+
+def build_dataset(args):
+    path = os.path.join(args.data_dir, f'dataset-{dataset_key(args)}.db')
+    if os.path.exists(path):
+        return path
+    os.makedirs(args.data_dir, exist_ok=True)
+    print(f'Seeding {args.articles} articles into {path} (cached for later runs)...', flush=True)
+    started = time.perf_counter()
+    building = f'{path}.{os.getpid()}.tmp'
+    app = make_app(building)
+    with app.app_context():
+        db.create_all()
+        # Seed before the FTS table exists: one 'rebuild' is far faster than per-row triggers
+        seed(n_categories=args.categories, n_articles=args.articles, body_words=args.body_words,
+             seed_value=args.seed, subcategories_per_category=args.subcategories, body_sigma=0.5,
+             spread_days=730)
+        ensure_search_index()
+        with db.engine.begin() as conn:
+            conn.execute(text('PRAGMA wal_checkpoint(TRUNCATE)'))
+        db.engine.dispose()
+    os.replace(building, path)
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(building + suffix):
+            os.remove(building + suffix)
+    print(f'Seeded in {time.perf_counter() - started:.0f}s', flush=True)
+    return path
+
+
+# ⚙️ Configuration shared by both runners
+
+def server_env(run_dir, db_path, args, gemini_url):
+    return {
+        'DATABASE_URL': 'sqlite:///' + db_path,
+        'FEATURES': 'gemini,ocr,tts',
+        'GEMINI_API_KEY': 'benchmark',
+        'GEMINI_API_BASE': gemini_url,
+        'CACHE_TYPE': args.cache,
+        # Every OCR request runs tesseract: results are not cached
+        'OCR_CACHE_PATH': '',
+        'OCR_CACHE_MEMORY_ENTRIES': '0',
+        'TTS_CACHE_DIR': os.path.join(run_dir, 'tts'),
+        'TTS_PREGENERATE': '0',
+        'PROFILING_ENABLED': '1',
+        'PROFILE_DIR': os.path.join(run_dir, 'profiles'),
+        'METRICS_DIR': os.path.join(run_dir, 'metrics'),
+        'STUB_LATENCY_MS': str(args.stub_latency),
+    }
+
+
+def load_config(env):
+    """config.Config as it would be built in a process with `env` set."""
+    saved = os.environ.copy()
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location('benchmark_config', os.path.join(ROOT, 'config.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    return module.Config
+
+
+# 🏃 Runners
+
+def summarize(samples, statuses, errors, elapsed):
+    if not samples:
+        return {'requests': 0, 'errors': errors, 'statuses': dict(statuses)}
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'requests_per_s': round(len(samples) / elapsed, 1),
+        **percentiles(samples),
+    }
+
+
+def run_client(app, cases, fixture, iterations, warmup):
+    from io import BytesIO
+
+    client = app.test_client()
+    results = {}
+    for case_ in cases:
+        if case_.pool:
+            fixture.fill(case_.pool, warmup + iterations)
+        rng = random.Random(case_.name)
+        samples, statuses, errors = [], Counter(), 0
+        started = None
+        for i in range(warmup + iterations):
+            if i == warmup:
+                started = time.perf_counter()
+            try:
+                request = case_.build(fixture, rng)
+            except Exhausted:
+                break
+            headers = dict(request['headers'])
+            if request['auth']:
+                headers['Authorization'] = f'Bearer {fixture.token}'
+            data = request['body']
+            if request['form'] is not None or request['files']:
+                # Same shapes as `requests`: a dict, or a list of (field, file) for repeated fields
+                data = dict(request['form'] or {})
+                files = request['files'] or {}
+                for name, (filename, content) in (files.items() if isinstance(files, dict) else files):
+                    data.setdefault(name, []).append((BytesIO(content), filename))
+            start = time.perf_counter()
+            response = client.open(request['path'], method=request['method'], json=request['json'], data=data,
+                                   headers=headers, content_type=request['content_type'])
+            response.get_data()  # Drain streamed bodies
+            elapsed = (time.perf_counter() - start) * 1000
+            response.close()
+            if i >= warmup:
+                samples.append(elapsed)
+                statuses[response.status_code] += 1
+                errors += response.status_code >= 500
+        results[case_.name] = {'endpoint': case_.endpoint,
+                               **summarize(samples, statuses, errors, time.perf_counter() - (started or 0))}
+        print_row(case_.name, results[case_.name])
+    return results
+
+
+def start_server(env, run_dir, args):
+    port = free_port()
+    env = dict(os.environ, **env, WORKER_PROFILE=args.profile, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_ACCESSLOG='')
+    if args.workers:
+        env['GUNICORN_WORKERS'] = str(args.workers)
+    if args.threads:
+        env['GUNICORN_THREADS'] = str(args.threads)
+    if args.worker_class:
+        env['GUNICORN_WORKER_CLASS'] = args.worker_class
+    # Run from run_dir: uploads are written relative to the working directory
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+         '--pythonpath', f'{ROOT},{BENCHMARKS}', 'stub_wsgi:app'],
+        cwd=run_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url + '/api/categories', timeout=2).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.3)
+    process.kill()
+    raise RuntimeError(f'gunicorn did not start: {process.stderr.read().decode()[-2000:]}')
+
+
+def run_server(base_url, cases, fixture, duration, concurrency, warmup, pool_size):
+    results = {}
+
+    def send(session, request):
+        headers = dict(request['headers'])
+        if request['auth']:
+            headers['Authorization'] = f'Bearer {fixture.token}'
+        if request['content_type']:
+            headers['Content-Type'] = request['content_type']
+        response = session.request(request['method'], base_url + request['path'], json=request['json'],
+                                   data=request['form'] or request['body'], files=request['files'],
+                                   headers=headers, timeout=120)
+        return response.status_code
+
+    for case_ in cases:
+        if case_.pool:
+            fixture.fill(case_.pool, pool_size)
+        session = requests.Session()
+        rng = random.Random(case_.name)
+        try:
+            for _ in range(warmup):
+                send(session, case_.build(fixture, rng))
+        except Exhausted:
+            pass
+
+        samples, statuses, errors = [], Counter(), [0]
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + duration
+
+        def worker(number):
+            local_rng = random.Random(f'{case_.name}:{number}')
+            local_session = requests.Session()
+            local_samples, local_statuses, failed = [], Counter(), 0
+            while time.perf_counter() < stop_at:
+                try:
+                    request = case_.build(fixture, local_rng)
+                except Exhausted:
+                    break
+                start = time.perf_counter()
+                try:
+                    status = send(local_session, request)
+                except requests.RequestException:
+                    status = 'exception'
+                local_samples.append((time.perf_counter() - start) * 1000)
+                local_statuses[status] += 1
+                failed += status == 'exception' or status >= 500
+            with lock:
+                samples.extend(local_samples)
+                statuses.update(local_statuses)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results[case_.name] = {'endpoint': case_.endpoint,
+                               **summarize(samples, statuses, errors[0], time.perf_counter() - started)}
+        print_row(case_.name, results[case_.name])
+    return results
+
+
+def print_row(name, stats):
+    if not stats['requests']:
+        print(f'  {name:<30} no requests completed')
+        return
+    print(f"  {name:<30} {stats['requests_per_s']:>8} req/s  p50 {stats['p50_ms']:>9.2f}  p95 {stats['p95_ms']:>9.2f}  "
+          f"p99 {stats['p99_ms']:>9.2f} ms  errors {stats['errors']}", flush=True)
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=100000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--subcategories', type=int, default=5, help='Per category')
+    parser.add_argument('--body-words', type=int, default=500, help='Median article length')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'blog-api-bench'),
+                        help='Where seeded datasets are kept between runs')
+    parser.add_argument('--modes', nargs='+', default=['client', 'server'], choices=['client', 'server'])
+    parser.add_argument('--cases', nargs='+', help='Only cases starting with one of these names (e.g. articles gemini)')
+    parser.add_argument('--iterations', type=int, default=200, help='Requests per case in client mode')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--duration', type=float, default=5, help='Seconds per case in server mode')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=5000,
+                        help='Rows a delete case may consume in server mode (it stops early when they run out)')
+    parser.add_argument('--profile', default='api', choices=['api', 'ocr'], help='gunicorn WORKER_PROFILE')
+    parser.add_argument('--workers', type=int, help='Override GUNICORN_WORKERS')
+    parser.add_argument('--threads', type=int, help='Override GUNICORN_THREADS')
+    parser.add_argument('--worker-class', choices=['sync', 'gthread'], help='Override GUNICORN_WORKER_CLASS')
+    parser.add_argument('--cache', default='null', choices=['null', 'local'],
+                        help='CACHE_TYPE: null times the routes themselves, local includes the response cache')
+    parser.add_argument('--stub-latency', type=float, default=50, help='Stubbed upstream latency (ms)')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    cases = [c for c in CASES if not args.cases or c.name.startswith(tuple(args.cases))]
+    skipped = {}
+    if shutil.which('tesseract') is None:
+        skipped.update({c.name: 'tesseract is not installed' for c in cases if c.needs == 'tesseract'})
+    cases = [c for c in cases if c.name not in skipped]
+
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    args.data_dir = os.path.abspath(args.data_dir)
+    run_dir = tempfile.mkdtemp(prefix='blog-api-suite-')
+    # Uploads are written relative to the working directory (images.UPLOAD_FOLDER, created on import)
+    os.chdir(run_dir)
+
+    dataset = build_dataset(args)
+    corpus = load_corpus()
+    os.environ['STUB_LATENCY_MS'] = str(args.stub_latency)
+    results = {}
+    uncovered = []
+
+    with GeminiStub() as gemini:
+        for mode in args.modes:
+            db_path = os.path.join(run_dir, f'{mode}.db')
+            shutil.copyfile(dataset, db_path)
+            env = server_env(run_dir, db_path, args, gemini.url)
+            config = load_config(env)
+
+            # The fixture rows are written through an app on the same copy
+            fixture = Fixture(mode, args.articles, corpus)
+            fixture.prepare(make_app(db_path), env['TTS_CACHE_DIR'], env['PROFILE_DIR'])
+
+            print(f'\n{mode}:', flush=True)
+            if mode == 'client':
+                from app import create_app
+
+                app = create_app(config)
+                install_stubs(args.stub_latency / 1000)
+                endpoints = {rule.endpoint for rule in app.url_map.iter_rules()} - {'static'}
+                uncovered = sorted(endpoints - {c.endpoint for c in CASES})
+                results[mode] = run_client(app, cases, fixture, args.iterations, args.warmup)
+            else:
+                process, base_url = start_server(env, run_dir, args)
+                try:
+                    results[mode] = run_server(base_url, cases, fixture, args.duration, args.concurrency, args.warmup,
+                                                  args.pool_size)
+                finally:
+                    process.terminate()
+                    try:
+                        process.wait(timeout=30)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+
+    commit, dirty = git_revision()
+    report = {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'dataset': os.path.basename(dataset),
+            'ocr_corpus': corpus_digest(corpus),
+            'settings': {key: value for key, value in vars(args).items() if key not in ('json', 'data_dir')},
+        },
+        'results': results,
+        'skipped': skipped,
+        'uncovered': uncovered,
+    }
+    if skipped:
+        print(f"\nSkipped: {', '.join(f'{name} ({reason})' for name, reason in skipped.items())}")
+    if uncovered:
+        print(f"Routes without a case: {', '.join(uncovered)}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.json}')
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+import click
+from flask.cli import AppGroup
+from sqlalchemy.exc import IntegrityError
+from cache import cache
+from db import db
+from models import Article, Category, SubCategory, bump_table_versions, make_excerpt, refresh_article_counts, utcnow
+
+# Bulk import / export of articles and taxonomy as NDJSON or CSV.
+#
+# Input is parsed one line at a time and validated against lookups loaded once
+# up front (category/subcategory slugs, existing slugs), then written with one
+# executemany INSERT per chunk, each chunk in its own transaction. A bad row is
+# reported with its line number and skipped; it never aborts the batch. Input
+# that cannot be read at all (bad UTF-8, broken CSV quoting) stops the import
+# with ImportAborted, whose report covers every line before the failure. Core
+# inserts bypass the ORM events, so excerpts and table versions are written here
+# and the stored article counts are recomputed once at the end, however the
+# import ends: earlier chunks are already committed. Exports page through the table
+# by primary key, so memory stays flat however many rows there are.
+#
+# Rows reference categories and subcategories by slug, so an export of one
+# database imports cleanly into another.
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportAborted(Exception):
+    """The input became unreadable part way; `report` covers the lines before `report['aborted']['line']`."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def guess_format(name, mimetype=None):
+    if (mimetype or '').startswith('text/csv') or (name or '').lower().endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+def parse_rows(lines, fmt):
+    """Yield (line number, row dict) from text lines; malformed lines yield a RowError instead of a dict."""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {k: v for k, v in row.items() if k is not None}
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, RowError(f'Invalid JSON: {e}')
+            continue
+        yield number, row if isinstance(row, dict) else RowError('Expected a JSON object')
+
+
+class Lookups:
+    """Everything validation needs, loaded with one query per table."""
+
+    def __init__(self):
+        self.categories = dict(db.session.query(Category.slug, Category.id))
+        self.category_ids = set(self.categories.values())
+        self.subcategories = {slug: (id, category_id) for slug, id, category_id in
+                              db.session.query(SubCategory.slug, SubCategory.id, SubCategory.category_id)}
+        self.subcategory_ids = {id: category_id for id, category_id in self.subcategories.values()}
+        self.slugs = {
+            'categories': set(self.categories),
+            'subcategories': set(self.subcategories),
+            'articles': {slug for (slug,) in db.session.query(Article.slug)},
+        }
+
+
+def _required(row, *names):
+    values = []
+    for name in names:
+        value = row.get(name)
+        if value is None or str(value).strip() == '':
+            raise RowError(f'Missing {name}')
+        values.append(str(value).strip() if name != 'body' else str(value))
+    return values
+
+
+def _unique_slug(kind, slug, lookups):
+    if slug in lookups.slugs[kind]:
+        raise RowError(f"Slug '{slug}' already exists")
+    lookups.slugs[kind].add(slug)  # Also catches duplicates within the same file
+    return slug
+
+
+def _category_id(row, lookups):
+    if row.get('category'):
+        category_id = lookups.categories.get(str(row['category']).strip())
+        if category_id is None:
+            raise RowError(f"Unknown category '{row['category']}'")
+        return category_id
+    if row.get('category_id') not in (None, ''):
+        try:
+            category_id = int(row['category_id'])
+        except (TypeError, ValueError):
+            raise RowError('category_id must be an integer')
+        if category_id not in lookups.category_ids:
+            raise RowError(f'Unknown category_id {category_id}')
+        return category_id
+    raise RowError('Missing category')
+
+
+def _subcategory_id(row, category_id, lookups):
+    if row.get('subcategory'):
+        found = lookups.subcategories.get(str(row['subcategory']).strip())
+        if found is None:
+            raise RowError(f"Unknown subcategory '{row['subcategory']}'")
+        subcategory_id, parent_id = found
+    elif row.get('subcategory_id') not in (None, ''):
+        try:
+            subcategory_id = int(row['subcategory_id'])
+        except (TypeError, ValueError):
+            raise RowError('subcategory_id must be an integer')
+        if subcategory_id not in lookups.subcategory_ids:
+            raise RowError(f'Unknown subcategory_id {subcategory_id}')
+        parent_id = lookups.subcategory_ids[subcategory_id]
+    else:
+        return None
+    if parent_id != category_id:
+        raise RowError('Subcategory does not belong to this category')
+    return subcategory_id
+
+
+def _timestamp(row, name):
+    value = row.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise RowError(f'{name} must be an ISO 8601 date')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def prepare_category(row, lookups):
+    title, slug = _required(row, 'title', 'slug')
+    return {'title': title, 'slug': _unique_slug('categories', slug, lookups), 'thumbnail': row.get('thumbnail') or None}
+
+
+def prepare_subcategory(row, lookups):
+    title, slug = _required(row, 'title', 'slug')
+    category_id = _category_id(row, lookups)
+    return {
+        'title': title,
+        'slug': _unique_slug('subcategories', slug, lookups),
+        'category_id': category_id,
+        'thumbnail': row.get('thumbnail') or None,
+    }
+
+
+def prepare_article(row, lookups):
+    title, slug, body = _required(row, 'title', 'slug', 'body')
+    category_id = _category_id(row, lookups)
+    subcategory_id = _subcategory_id(row, category_id, lookups)
+    published_at = _timestamp(row, 'published_at')
+    created_at = _timestamp(row, 'created_at')
+    fallback = published_at or created_at or utcnow()
+    return {
+        'title': title,
+        'slug': _unique_slug('articles', slug, lookups),
+        'body': body,
+        'excerpt': make_excerpt(body),  # Core inserts skip the ORM hook
+        'category_id': category_id,
+        'subcategory_id': subcategory_id,
+        'thumbnail': row.get('thumbnail') or None,
+        # Every row carries the same keys so each chunk is a single executemany
+        'published_at': published_at or fallback,
+        'created_at': created_at or fallback,
+    }
+
+
+def _export_category(row, names):
+    return {'slug': row.slug, 'title': row.title, 'thumbnail': row.thumbnail}
+
+
+def _export_subcategory(row, names):
+    return {'slug': row.slug, 'title': row.title, 'category': names['categories'].get(row.category_id),
+            'thumbnail': row.thumbnail}
+
+
+def _export_article(row, names):
+    return {
+        'slug': row.slug,
+        'title': row.title,
+        'body': row.body,
+        'category': names['categories'].get(row.category_id),
+        'subcategory': names['subcategories'].get(row.subcategory_id),
+        'thumbnail': row.thumbnail,
+        'published_at': row.published_at.isoformat() if row.published_at else None,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+# kind -> (model, row validator, exported columns, export serializer)
+KINDS = {
+    'categories': (Category, prepare_category,
+                   (Category.id, Category.slug, Category.title, Category.thumbnail), _export_category),
+    'subcategories': (SubCategory, prepare_subcategory,
+                      (SubCategory.id, SubCategory.slug, SubCategory.title, SubCategory.category_id,
+                       SubCategory.thumbnail), _export_subcategory),
+    'articles': (Article, prepare_article,
+                 (Article.id, Article.slug, Article.title, Article.body, Article.category_id, Article.subcategory_id,
+                  Article.thumbnail, Article.published_at, Article.created_at), _export_article),
+}
+
+
+def _record_error(report, line, message):
+    report['failed'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line, 'error': message})
+    else:
+        report['errors_truncated'] = True
+
+
+def _insert_chunk(model, chunk, report):
+    try:
+        db.session.execute(db.insert(model), [values for _, values in chunk])
+        bump_table_versions(db.session.connection(), model)
+        db.session.commit()
+        report['inserted'] += len(chunk)
+    except IntegrityError:
+        # Something the lookups could not see (e.g. a concurrent write): retry row by row
+        # so only the offending rows are rejected
+        db.session.rollback()
+        for line, values in chunk:
+            try:
+                db.session.execute(db.insert(model), [values])
+                bump_table_versions(db.session.connection(), model)
+                db.session.commit()
+                report['inserted'] += 1
+            except IntegrityError as e:
+                db.session.rollback()
+                _record_error(report, line, f'Rejected by the database: {e.orig}')
+
+
+def import_rows(kind, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Validate and insert `rows` ((line, dict) pairs from parse_rows); returns a report dict."""
+    model, prepare, _, _ = KINDS[kind]
+    lookups = Lookups()
+    report = {'kind': kind, 'received': 0, 'inserted': 0, 'failed': 0, 'errors': []}
+
+    chunk = []
+    line = 0
+    try:
+        try:
+            for line, row in rows:
+                report['received'] += 1
+                try:
+                    if isinstance(row, RowError):
+                        raise row
+                    chunk.append((line, prepare(row, lookups)))
+                except RowError as e:
+                    _record_error(report, line, str(e))
+                    continue
+                if len(chunk) >= chunk_size:
+                    _insert_chunk(model, chunk, report)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Keep what was read before the failure, so the report is exact up to that line
+            message = 'Input is not valid UTF-8' if isinstance(e, UnicodeDecodeError) else f'Invalid CSV: {e}'
+            if chunk:
+                _insert_chunk(model, chunk, report)
+            report['aborted'] = {'line': line + 1, 'error': message}
+            raise ImportAborted(message, report) from e
+        if chunk:
+            _insert_chunk(model, chunk, report)
+    finally:
+        if report['inserted']:
+            db.session.rollback()  # Drop whatever a failed statement left open; inserted chunks are committed
+            if kind == 'articles':
+                refresh_article_counts()
+                db.session.commit()
+            cache.invalidate('articles', 'categories', 'subcategories')
+    return report
+
+
+def export_rows(kind, batch_size=DEFAULT_CHUNK_SIZE):
+    """Yield export dicts for every row of `kind`, reading `batch_size` rows per query."""
+    model, _, columns, serialize = KINDS[kind]
+    names = {
+        'categories': dict(db.session.query(Category.id, Category.slug)),
+        'subcategories': dict(db.session.query(SubCategory.id, SubCategory.slug)),
+    }
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(*columns).where(model.id > last_id).order_by(model.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        for row in rows:
+            yield serialize(row, names)
+        last_id = rows[-1].id
+
+
+def format_rows(rows, fmt):
+    """Encode export dicts as NDJSON or CSV text chunks."""
+    if fmt == 'ndjson':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+bulk_cli = AppGroup('bulk', help='Bulk import/export of articles and taxonomy (NDJSON or CSV).')
+
+
+@bulk_cli.command('import')
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Rows per transaction.')
+def import_command(kind, source, fmt, chunk_size):
+    """Import KIND rows from SOURCE (a file, or - for stdin)."""
+    try:
+        report = import_rows(kind, parse_rows(source, fmt or guess_format(source.name)), chunk_size)
+    except ImportAborted as e:
+        report = e.report
+    for error in report['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    if 'aborted' in report:
+        click.echo(f"line {report['aborted']['line']}: {report['aborted']['error']}", err=True)
+        raise click.ClickException(f"Stopped after {report['inserted']} {kind} imported, {report['failed']} rejected")
+    click.echo(f"✅ {report['inserted']} {kind} imported, {report['failed']} rejected")
+
+
+@bulk_cli.command('export')
+@click.argument('kind', type=click.Choice(list(KINDS)))
+@click.argument('target', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), help='Defaults to the file extension.')
+def export_command(kind, target, fmt):
+    """Export all KIND rows to TARGET (default: stdout)."""
+    for chunk in format_rows(export_rows(kind), fmt or guess_format(target.name)):
+        target.write(chunk)
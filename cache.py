@@ -0,0 +1,229 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import g, request, make_response
+
+# Response cache for public read endpoints.
+#
+# Entries are keyed by route + query args and by the current "generation" of
+# every namespace the view depends on (e.g. articles also depend on categories
+# because they embed category_title). Mutating handlers call
+# `cache.invalidate('articles')`, which bumps that generation: every dependent
+# entry becomes unreachable at once and ages out of the LRU, without scanning.
+#
+# Under @conditional the key also carries the request's validator (the table
+# versions read from the database), so a body is only ever served with the
+# ETag it was built for. That covers what generations cannot: writes handled by
+# another worker process, and requests between a commit and its invalidate().
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with per-entry TTL and an entry-count bound."""
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one.
+
+    The first caller runs `fn`; callers arriving while it is in flight wait and
+    receive the same result (or exception) instead of repeating the work.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns `(result, shared)`; `shared` is True for callers that waited."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class LocalBackend:
+    """In-process backend; also the stand-in for the shared backend in dev/tests."""
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.entries = LRUCache(max_entries, default_ttl)
+        # Generations live outside the LRU: losing one would resurrect stale entries
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.entries.set(key, value, ttl)
+
+    def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        self.entries.clear()
+
+
+class RedisBackend:
+    """Shared backend so every worker process sees the same entries and invalidations."""
+
+    def __init__(self, url, default_ttl=300, prefix='blogapi:'):
+        import redis  # Optional dependency, only needed for CACHE_TYPE=redis
+
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def generation(self, namespace):
+        return int(self.client.get(f'{self.prefix}gen:{namespace}') or 0)
+
+    def bump(self, namespace):
+        self.client.incr(f'{self.prefix}gen:{namespace}')
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_TYPE', 'local')
+        app.config.setdefault('CACHE_DEFAULT_TTL', 300)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('CACHE_REDIS_URL', None)
+
+        cache_type = app.config['CACHE_TYPE']
+        ttl = app.config['CACHE_DEFAULT_TTL']
+        if cache_type == 'redis':
+            if not app.config['CACHE_REDIS_URL']:
+                raise ValueError('CACHE_TYPE=redis needs CACHE_REDIS_URL (or set CACHE_TYPE=local for per-process caches)')
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'], default_ttl=ttl)
+        elif cache_type == 'local':
+            self.backend = LocalBackend(app.config['CACHE_MAX_ENTRIES'], default_ttl=ttl)
+        elif cache_type == 'null':
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown CACHE_TYPE: {cache_type}")
+        self.enabled = self.backend is not None
+
+    def _key(self, namespaces):
+        generations = ','.join(f'{ns}{self.backend.generation(ns)}' for ns in namespaces)
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        return f"resp:{generations}:{g.get('validator_version', '')}:{request.path}?{args}"
+
+    def cached(self, *namespaces, ttl=None):
+        """Cache successful GET responses of a view under `namespaces`."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != 'GET':
+                    return view(*args, **kwargs)
+
+                key = self._key(namespaces)
+                hit = self.backend.get(key)
+                if hit is not None:
+                    body, status, mimetype = hit
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    self.backend.set(key, (response.get_data(), 200, response.mimetype), ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *namespaces):
+        if self.enabled:
+            for namespace in namespaces:
+                self.backend.bump(namespace)
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+
+cache = ResponseCache()
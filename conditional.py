@@ -0,0 +1,83 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import g, request, make_response
+from sqlalchemy import select
+from db import db
+from models import TableVersion
+
+# HTTP conditional requests (ETag / Last-Modified / 304).
+#
+# A view declares a cheap "validator" that describes the version of the data it
+# would serialize (the change counters of the tables involved).
+# The validator runs before the view: when the client's If-None-Match /
+# If-Modified-Since still matches, we answer 304 without loading or
+# serializing anything.
+
+
+def table_versions(*models):
+    """(version string, newest change) across `models`, in one primary-key lookup.
+
+    Every insert, update and delete bumps its table's TableVersion row (see
+    models.bump_table_versions), so the validator never scans the tables.
+    """
+    names = [model.__tablename__ for model in models]
+    rows = dict((name, (version, ts)) for name, version, ts in db.session.execute(
+        select(TableVersion.name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.name.in_(names))
+    ))
+    version = ';'.join(f'{name}:{rows[name][0]}' if name in rows else f'{name}:-' for name in names)
+    stamps = [ts for _, ts in rows.values() if ts is not None]
+    return version, max(stamps) if stamps else None
+
+
+def make_etag(version):
+    # The query string is part of the representation (page, fields, search, ...)
+    args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    raw = f'{request.path}?{args}|{version}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(validator):
+    """Decorate a GET view with ETag/Last-Modified handling.
+
+    `validator(*args, **kwargs)` receives the view arguments and returns
+    `(version, last_modified)`, or None to skip validation (e.g. not found).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            validated = validator(*args, **kwargs)
+            if validated is None:
+                return view(*args, **kwargs)
+
+            version, last_modified = validated
+            g.validator_version = version  # Part of the response cache key (see cache.py)
+            etag = make_etag(version)
+            if last_modified is not None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+            if _is_not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Always revalidate; the 304 round-trip is cheap and never serves stale content
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -1,3 +1,76 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 
 db = SQLAlchemy()
+
+# Engine configuration.
+#
+# SQLite (the default) is opened in WAL mode so readers never block on a writer
+# and writers only serialise among themselves; synchronous=NORMAL is safe with
+# WAL (a power cut can lose the last commits, never corrupt the file); mmap and
+# a larger page cache keep hot pages out of read() calls; and busy_timeout makes
+# a connection wait for the write lock instead of failing with "database is
+# locked". Pragmas are per connection, so they are applied on every connect.
+#
+# Any other DATABASE_URL (e.g. postgresql+psycopg2://...) gets a sized
+# connection pool with pre-ping and recycling instead.
+
+
+def _sqlite_pragmas(config):
+    return {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT_MS'],
+        'cache_size': -config['SQLITE_CACHE_SIZE_KB'],  # negative: size in KiB, not pages
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'temp_store': 'MEMORY',
+    }
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database URL."""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if url.get_backend_name() == 'sqlite':
+        # Python's own lock wait; busy_timeout below covers statements as well
+        connect_args = dict(options.get('connect_args', {}))
+        connect_args.setdefault('timeout', config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+        options['connect_args'] = connect_args
+        return options
+
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])  # Outlive server-side idle timeouts
+    options.setdefault('pool_pre_ping', True)
+    return options
+
+
+def init_engine(app):
+    """Configure and initialise `db` for `app` (use instead of db.init_app)."""
+    config = app.config
+    config.setdefault('SQLITE_JOURNAL_MODE', 'WAL')
+    config.setdefault('SQLITE_SYNCHRONOUS', 'NORMAL')
+    config.setdefault('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    config.setdefault('SQLITE_CACHE_SIZE_KB', 64 * 1024)
+    config.setdefault('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    config.setdefault('DB_POOL_SIZE', 5)
+    config.setdefault('DB_MAX_OVERFLOW', 10)
+    config.setdefault('DB_POOL_TIMEOUT', 30)
+    config.setdefault('DB_POOL_RECYCLE', 1800)
+
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config)
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            pragmas = _sqlite_pragmas(config)
+
+            @event.listens_for(engine, 'connect')
+            def set_sqlite_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for name, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {name}={value}')
+                cursor.close()
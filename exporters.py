@@ -0,0 +1,156 @@
+import textwrap
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+# Export formats for OCR text, produced in memory or streamed chunk by chunk.
+#
+# Nothing touches the filesystem: TXT/Markdown/PDF are generators the response
+# streams directly, DOCX is zipped into a BytesIO. The PDF writer emits one
+# page at a time and only keeps byte offsets for the xref table, so memory
+# stays flat however long the text is.
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+FONT_SIZE = 11
+LINE_HEIGHT = 14
+CHARS_PER_LINE = 90  # Helvetica 11pt across the text width
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+
+
+def iter_txt(text, chunk_size=64 * 1024):
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size].encode('utf-8')
+
+
+def iter_markdown(text, title='OCR Export'):
+    yield f'# {title}\n\n'.encode('utf-8')
+    # Blank-line separated paragraphs; single newlines become hard breaks
+    for paragraph in text.split('\n\n'):
+        lines = [line.rstrip() for line in paragraph.splitlines()]
+        yield ('  \n'.join(lines) + '\n\n').encode('utf-8')
+
+
+def _pdf_string(line):
+    # The standard Helvetica font only covers WinAnsi (Latin-1); other glyphs become '?'
+    raw = line.encode('latin-1', 'replace')
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _wrapped_lines(text):
+    for line in text.splitlines() or ['']:
+        yield from textwrap.wrap(line, CHARS_PER_LINE, replace_whitespace=False, drop_whitespace=True) or ['']
+
+
+def iter_pdf(text):
+    """Stream a minimal PDF 1.4 document, one page per chunk."""
+    offsets = {}
+    position = 0
+
+    def emit(number, body):
+        nonlocal position
+        chunk = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        offsets[number] = position
+        position += len(chunk)
+        return chunk
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position = len(header)
+    yield header
+    # 1: catalog, 2: page tree (written last, once the page count is known), 3: font
+    yield emit(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    yield emit(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    page_ids = []
+    next_id = 4
+    lines = _wrapped_lines(text)
+    while True:
+        page_lines = [line for _, line in zip(range(LINES_PER_PAGE), lines)]
+        if not page_lines and page_ids:
+            break
+
+        top = PAGE_HEIGHT - MARGIN - FONT_SIZE
+        content = [b'BT /F1 %d Tf %d TL %d %d Td' % (FONT_SIZE, LINE_HEIGHT, MARGIN, top)]
+        content += [b'(' + _pdf_string(line) + b") '" for line in page_lines]
+        content.append(b'ET')
+        stream = b'\n'.join(content)
+
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        yield emit(content_id, b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        yield emit(page_id, (
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+        ) % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        page_ids.append(page_id)
+
+        if len(page_lines) < LINES_PER_PAGE:
+            break
+
+    kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+    yield emit(2, b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(page_ids))
+
+    xref_at = position
+    xref = [b'xref\n0 %d\n' % next_id, b'0000000000 65535 f \n']
+    xref += [b'%010d 00000 n \n' % offsets[number] for number in range(1, next_id)]
+    yield b''.join(xref)
+    yield b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (next_id, xref_at)
+
+
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def build_docx(text):
+    """Minimal WordprocessingML document, one paragraph per line (full Unicode)."""
+    paragraphs = ''.join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>'
+        for line in text.splitlines() or ['']
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{paragraphs}</w:body></w:document>'
+    )
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr('[Content_Types].xml', _DOCX_CONTENT_TYPES)
+        docx.writestr('_rels/.rels', _DOCX_RELS)
+        docx.writestr('word/document.xml', document)
+    return buffer.getvalue()
+
+
+# type -> (mimetype, extension)
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', 'txt'),
+    'md': ('text/markdown; charset=utf-8', 'md'),
+    'pdf': ('application/pdf', 'pdf'),
+    'docx': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
+}
+
+
+def export_chunks(text, export_type):
+    if export_type == 'txt':
+        return iter_txt(text)
+    if export_type == 'md':
+        return iter_markdown(text)
+    if export_type == 'pdf':
+        return iter_pdf(text)
+    if export_type == 'docx':
+        return iter([build_docx(text)])
+    raise ValueError(f'Invalid export type: {export_type}')
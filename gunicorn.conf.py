@@ -0,0 +1,120 @@
+# Gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Two worker profiles, picked with WORKER_PROFILE, meant to run as two
+# gunicorn instances behind the reverse proxy:
+#
+#   api  JSON/content routes. I/O bound (SQLite, cache, upstream HTTP), so
+#        threaded workers: (2 x CPU) + 1 processes with a few threads each.
+#   ocr  /api/ocr*. Every OCR route runs tesseract in the OCR process pool
+#        (one process per core, OCR_WORKERS), so few web workers are needed;
+#        more would only multiply pools and oversubscribe the CPU. Longer
+#        timeout for bulk uploads.
+#
+#   location /api/ocr { proxy_pass http://127.0.0.1:8001; }
+#   location /        { proxy_pass http://127.0.0.1:8000; }
+#
+# Worker classes were picked with the benchmark suite
+# (python benchmarks/suite.py --modes server --profile P --worker-class C;
+# 1 CPU, 100k articles, 8 client threads, stubbed upstreams at 50 ms):
+#
+#   api  sync vs gthread: mixed on SQLite-bound routes, within noise overall
+#        (total 6040 vs 5872 req/s over 43 cases), but p95 rises with sync
+#        wherever a request waits: gemini.upstream 145 -> 269 ms,
+#        tts.synthesize 92 -> 111 ms, auth.login 1411 -> 2284 ms. Real
+#        upstreams take seconds, so a sync worker per call would stall: gthread.
+#   ocr  the web worker only waits on the pool, like an upstream call:
+#        sync (2 workers) vs gthread (2 x 4 threads) gave 620 vs 788 req/s
+#        and higher p95 on every case (job_status 58 -> 82 ms, export_txt
+#        39 -> 92 ms): gthread. The tesseract-bound cases need tesseract
+#        installed; re-run them with --cases ocr when changing this.
+#
+# Every value can be overridden with the matching GUNICORN_* variable
+# (GUNICORN_WORKER_CLASS for the worker class). Both profiles must boot with
+# no settings at all: python benchmarks/check_gunicorn_boot.py.
+import multiprocessing
+import os
+import tempfile
+
+cpu_count = multiprocessing.cpu_count()
+profile = os.getenv('WORKER_PROFILE', 'api')
+
+PROFILES = {
+    'api': {
+        'bind': '0.0.0.0:8000',
+        'worker_class': 'gthread',
+        'workers': cpu_count * 2 + 1,
+        'threads': 4,
+        'timeout': 30,
+    },
+    'ocr': {
+        'bind': '0.0.0.0:8001',
+        'worker_class': 'gthread',
+        'workers': max(2, cpu_count // 4),
+        'threads': 4,
+        'timeout': 300,
+    },
+}
+settings = PROFILES[profile]
+
+bind = os.getenv('GUNICORN_BIND', settings['bind'])
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', settings['worker_class'])
+workers = int(os.getenv('GUNICORN_WORKERS', settings['workers']))
+threads = int(os.getenv('GUNICORN_THREADS', settings['threads']))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', settings['timeout']))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Import the app once in the master; workers fork with the code already loaded
+# (faster boot, shared pages). Nothing opens DB/HTTP connections at import time.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+# Graceful restarts: `kill -HUP <master>` swaps workers without dropping requests,
+# and workers are recycled (with jitter, so not all at once) to cap memory growth.
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-') or None  # empty disables it
+errorlog = '-'
+
+
+# The OCR profile's tesseract pool is per web worker, so each worker gets its
+# share of the cores. Set before the app (and Config) is imported.
+if profile == 'ocr':
+    os.environ.setdefault('OCR_WORKERS', str(max(1, cpu_count // workers)))
+
+# Several workers share one response cache in Redis when CACHE_REDIS_URL is
+# set: with per-process caches every worker warms and holds its own copy of
+# each entry. Without it the workers keep local caches, which stay correct
+# (entries are keyed by table version) but hit rates drop with the number of
+# workers; on_starting says so. An explicit CACHE_TYPE always wins.
+local_cache_notice = False
+if workers > 1 and 'CACHE_TYPE' not in os.environ:
+    if os.getenv('CACHE_REDIS_URL'):
+        os.environ['CACHE_TYPE'] = 'redis'
+    else:
+        local_cache_notice = True
+
+# Each worker keeps its own metrics and snapshots them here, so whichever one
+# answers GET /metrics reports the totals of all of them. One directory per
+# profile: the two instances are scraped separately. Empty disables it.
+metrics_dir = os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'blog-api-metrics-{profile}'))
+
+
+def on_starting(server):
+    if local_cache_notice:
+        server.log.info('CACHE_REDIS_URL is not set: %d workers keep separate local response caches', workers)
+    if metrics_dir:
+        from metrics import clear_snapshots
+        clear_snapshots(metrics_dir)  # Counters restart with the server
+
+
+def worker_exit(server, worker):
+    if metrics_dir:
+        from metrics import snapshots
+        snapshots.write()  # Keep what happened since the last periodic write
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        from metrics import archive_snapshot
+        archive_snapshot(metrics_dir, worker.pid)
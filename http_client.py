@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import deque
+from flask import current_app
+from metrics import record_outbound
+
+# Shared outbound HTTP client for third-party APIs (Gemini, translation, TTS).
+#
+# One keep-alive connection pool per upstream instead of a fresh TLS handshake
+# per call, (connect, read) timeouts so a slow upstream cannot hang a worker,
+# bounded retries with exponential backoff for 429/5xx, and a circuit breaker
+# that fails fast while an upstream is down. Every call is timed per endpoint.
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Open after `failure_threshold` consecutive failures, let one probe through after `reset_timeout`s."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            # Half-open admits a single probe; everyone else keeps failing fast until it reports back
+            if state == 'open' or self._probing:
+                raise CircuitOpenError('Upstream temporarily unavailable (circuit open)')
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            # A failed half-open probe re-opens the circuit for another period
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyStats:
+    """Call count, error count and latency summary for one endpoint."""
+
+    def __init__(self, window=512):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms, error=False):
+        with self._lock:
+            self.count += 1
+            self.errors += int(error)
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.recent.append(elapsed_ms)
+
+    def summary(self):
+        with self._lock:
+            recent = sorted(self.recent)
+        pick = lambda p: round(recent[min(len(recent) - 1, int(p * len(recent)))], 2) if recent else None
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else None,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': pick(0.50),
+            'p95_ms': pick(0.95),
+        }
+
+
+class OutboundClient:
+    def __init__(self, name, base_url='', connect_timeout=3.05, read_timeout=30, retries=2,
+                 backoff=0.5, pool_size=10, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+        # requests/urllib3 load with the first client, not when the app is imported
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=False,  # A read timeout means the upstream is slow; raise it, don't pile on
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,  # Also retry POST; our upstream calls have no side effects
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _stats_for(self, endpoint):
+        with self._stats_lock:
+            return self.stats.setdefault(endpoint, LatencyStats())
+
+    def request(self, method, path, endpoint=None, **kwargs):
+        """Send a request; `endpoint` names the call in latency stats (defaults to `path`)."""
+        url = path if path.startswith(('http://', 'https://')) else self.base_url + path
+        kwargs.setdefault('timeout', self.timeout)
+        return self.call(endpoint or path.split('?')[0], self.session.request, method, url, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def call(self, endpoint, fn, *args, **kwargs):
+        """Run any upstream call (e.g. a third-party SDK) behind the breaker and stats."""
+        self.breaker.before_call()
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = fn(*args, **kwargs)
+            # Responses are returned to the caller, but 5xx still count against the upstream
+            failed = getattr(result, 'status_code', 0) >= 500
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stats_for(endpoint).record(elapsed * 1000, error=failed)
+            record_outbound(self.name, endpoint, elapsed, failed)
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+    def summary(self):
+        return {
+            'circuit': self.breaker.state,
+            'endpoints': {endpoint: stats.summary() for endpoint, stats in self.stats.items()},
+        }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, base_url=''):
+    """Shared client per upstream name, configured from the OUTBOUND_* app settings."""
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            config = current_app.config
+            client = OutboundClient(
+                name,
+                base_url=base_url,
+                connect_timeout=config.get('OUTBOUND_CONNECT_TIMEOUT', 3.05),
+                read_timeout=config.get('OUTBOUND_READ_TIMEOUT', 30),
+                retries=config.get('OUTBOUND_RETRIES', 2),
+                backoff=config.get('OUTBOUND_BACKOFF', 0.5),
+                pool_size=config.get('OUTBOUND_POOL_SIZE', 10),
+                failure_threshold=config.get('OUTBOUND_FAILURE_THRESHOLD', 5),
+                reset_timeout=config.get('OUTBOUND_RESET_TIMEOUT', 30.0),
+            )
+            _clients[name] = client
+        return client
+
+
+def all_stats():
+    return {name: client.summary() for name, client in _clients.items()}
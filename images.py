@@ -0,0 +1,156 @@
+import os
+from urllib.parse import urlsplit
+from flask import url_for
+from models import Article, Category, SubCategory
+from uploads import IMAGE_FORMATS, UploadError, uploads
+
+# Thumbnail pipeline shared by the article/category/subcategory upload handlers.
+#
+# Uploads are stored under their content hash, so identical files are written
+# once and never overwrite each other. Each upload is downscaled to a few
+# widths and encoded as JPEG (or PNG with transparency), WebP and, when Pillow
+# has libavif, AVIF. The variant map is stored on the row and returned to
+# clients ready to drop into <source srcset>.
+#
+# Only the image header is read on the request thread: it is enough to know
+# every variant's URL. The variants are encoded, and replaced thumbnails
+# deleted, on the upload service's background thread.
+
+UPLOAD_FOLDER = 'static/uploads'
+VARIANT_WIDTHS = (320, 640, 1280)
+
+QUALITY = {'jpeg': 82, 'webp': 80, 'avif': 60}
+EXTENSIONS = {'jpeg': 'jpg', 'png': 'png', 'webp': 'webp', 'avif': 'avif'}
+
+if not os.path.exists(UPLOAD_FOLDER):
+    os.makedirs(UPLOAD_FOLDER)
+
+
+def _output_formats(has_alpha):
+    from PIL import features
+
+    formats = ['png' if has_alpha else 'jpeg', 'webp']
+    if features.check('avif'):
+        formats.append('avif')
+    return formats
+
+
+def _variant_widths(width):
+    # Never upscale; tiny images still get a single variant at their own width
+    widths = [w for w in VARIANT_WIDTHS if w < width]
+    if width <= VARIANT_WIDTHS[-1]:
+        widths.append(width)
+    return widths or [VARIANT_WIDTHS[-1]]
+
+
+def _public_url(filename):
+    return url_for('static', filename=f'uploads/{filename}', _external=True)
+
+
+def _encode(image, fmt, path):
+    options = {'optimize': True} if fmt in ('jpeg', 'png') else {}
+    if fmt in QUALITY:
+        options['quality'] = QUALITY[fmt]
+    if fmt == 'jpeg':
+        options['progressive'] = True
+    image.save(path, format=fmt.upper(), **options)
+
+
+def plan_variants(path, digest):
+    """(formats, widths, fallback_url, variants) for the image at `path`, from its header alone."""
+    # Pillow is only needed once an upload arrives, not at worker boot
+    from PIL import ExifTags, Image
+
+    with Image.open(path) as image:
+        width, height = image.size
+        if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+            width, height = height, width  # exif_transpose() will rotate it by 90 degrees
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+    formats = _output_formats(has_alpha)
+    widths = _variant_widths(width)
+    variants = {}
+    for fmt in formats:
+        sizes = [{'width': w, 'url': _public_url(f'{digest}-{w}.{EXTENSIONS[fmt]}')} for w in widths]
+        variants[fmt] = {
+            'srcset': ', '.join(f"{s['url']} {s['width']}w" for s in sizes),
+            'sizes': sizes,
+        }
+
+    # The legacy `thumbnail` field points at the largest JPEG/PNG variant
+    fallback = variants[formats[0]]['sizes'][-1]['url']
+    return formats, widths, fallback, variants
+
+
+def write_variants(source, digest, formats, widths):
+    """Encode every missing variant of the uploaded file `source`, then delete it."""
+    from PIL import Image, ImageOps
+
+    try:
+        paths = {(fmt, width): os.path.join(UPLOAD_FOLDER, f'{digest}-{width}.{EXTENSIONS[fmt]}')
+                 for fmt in formats for width in widths}
+        missing = {key: path for key, path in paths.items() if not os.path.exists(path)}
+        if not missing:  # Same content already processed
+            return
+
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)  # Phone photos carry rotation in EXIF
+            image = image.convert('RGBA' if formats[0] == 'png' else 'RGB')
+        for (fmt, width), path in missing.items():
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            _encode(resized, fmt, path + '.tmp')
+            os.replace(path + '.tmp', path)
+    finally:
+        os.remove(source)
+
+
+def save_thumbnail(file):
+    """Accept an uploaded thumbnail; returns (url, variants) or (None, None) without a file.
+
+    Raises UploadError for files that are not images or are too large. The
+    returned URLs are served once the background encode finishes.
+    """
+    if not file or not file.filename:
+        return None, None
+    upload = uploads.store(file, UPLOAD_FOLDER, IMAGE_FORMATS)
+    try:
+        formats, widths, fallback, variants = plan_variants(upload.path, upload.digest[:32])
+    except Exception:
+        upload.discard()
+        raise UploadError('Invalid image file')
+    # Until this request's row is committed nothing in the database points at
+    # the digest, so a concurrent release of the same content must not delete it
+    uploads.hold(upload.digest[:32])
+    uploads.submit(write_variants, upload.path, upload.digest[:32], formats, widths)
+    return fallback, variants
+
+
+def _files_for(thumbnail, variants):
+    urls = [thumbnail] if thumbnail else []
+    for variant in (variants or {}).values():
+        urls.extend(size['url'] for size in variant.get('sizes', []))
+    return {os.path.join(UPLOAD_FOLDER, os.path.basename(url)) for url in urls}
+
+
+def _delete_unused(thumbnail, variants):
+    # Rows are matched on the stored file name: the URL's host is whatever the
+    # uploading request's Host header was, and names are content hashes
+    name = os.path.basename(urlsplit(thumbnail).path)
+    if uploads.is_held(name.partition('-')[0]):
+        return  # Same content is being saved by a request that has not committed yet
+    for model in (Article, Category, SubCategory):
+        if model.query.filter(model.thumbnail.endswith('/' + name, autoescape=True)).first() is not None:
+            return
+    for path in _files_for(thumbnail, variants):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def release_thumbnail(thumbnail, variants=None):
+    """Delete a thumbnail's files (in the background) unless another row still uses the same content.
+
+    Call after the owning row was deleted or repointed and committed.
+    """
+    if thumbnail:
+        uploads.submit(_delete_unused, thumbnail, variants)
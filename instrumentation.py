@@ -0,0 +1,36 @@
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request SQL statement counter.
+#
+# Every statement executed while a request is active bumps `g.sql_query_count`.
+# With SQL_QUERY_COUNT_HEADER enabled (or in debug mode) the total is returned
+# in the `X-SQL-Query-Count` response header, which makes N+1 regressions
+# visible from the browser's network tab.
+
+QUERY_COUNT_HEADER = 'X-SQL-Query-Count'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+
+
+def get_query_count():
+    return g.get('sql_query_count', 0) if has_app_context() else 0
+
+
+def init_query_counter(app):
+    app.config.setdefault('SQL_QUERY_COUNT_HEADER', False)
+
+    @app.before_request
+    def reset_query_count():
+        g.sql_query_count = 0
+
+    @app.after_request
+    def add_query_count_header(response):
+        if app.debug or app.config['SQL_QUERY_COUNT_HEADER']:
+            response.headers[QUERY_COUNT_HEADER] = str(get_query_count())
+        return response
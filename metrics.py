@@ -0,0 +1,305 @@
+import glob
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from instrumentation import get_query_count
+
+# Prometheus metrics, served as text at GET /metrics.
+#
+# Recording is a dict update under one lock: no client library, no per-request
+# allocation beyond the label string. Requests are labelled by URL rule
+# (`/api/articles/<int:id>`), never by raw path, so the series count stays
+# bounded. Every gunicorn worker keeps its own numbers; with METRICS_DIR set
+# (gunicorn.conf.py does) each one also writes a snapshot there every few
+# seconds, and whichever worker answers the scrape adds up all of them.
+#
+# Durations are in seconds and sizes in bytes, as Prometheus expects. Latency
+# of a streamed response is the time to its first byte.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+OCR_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger(__name__)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests by route and status.', None),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by route.', LATENCY_BUCKETS),
+    'http_request_size_bytes': ('histogram', 'HTTP request body size by route.', SIZE_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'HTTP response body size by route (not streamed ones).', SIZE_BUCKETS),
+    'http_request_sql_statements': ('histogram', 'SQL statements executed per HTTP request.', COUNT_BUCKETS),
+    'http_cache_total': ('counter', 'Responses served from (HIT) or stored in (MISS) a cache, by route.', None),
+    'sql_statements_total': ('counter', 'SQL statements executed, by operation.', None),
+    'sql_statement_duration_seconds': ('histogram', 'SQL statement duration by operation.', SQL_BUCKETS),
+    'outbound_requests_total': ('counter', 'Calls to third-party APIs by upstream, endpoint and outcome.', None),
+    'outbound_request_duration_seconds': ('histogram', 'Third-party API call latency (retries included).',
+                                          LATENCY_BUCKETS),
+    'ocr_images_total': ('counter', 'Images through OCR, by result (cached, ocr, error).', None),
+    'ocr_image_duration_seconds': ('histogram', 'Tesseract time per image (cache misses only).', OCR_BUCKETS),
+    'ocr_image_size_bytes': ('histogram', 'Size of images submitted for OCR.', SIZE_BUCKETS),
+}
+SQL_OPERATIONS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**values):
+    """Label set in exposition syntax (without braces); also the key series are stored under."""
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in values.items())
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {name: {} for name in METRICS}
+
+    def inc(self, name, label_set='', amount=1):
+        with self._lock:
+            series = self._values[name]
+            series[label_set] = series.get(label_set, 0) + amount
+
+    def observe(self, name, value, label_set=''):
+        buckets = METRICS[name][2]
+        with self._lock:
+            series = self._values[name]
+            counts = series.get(label_set)
+            if counts is None:
+                # One slot per bucket, one for +Inf, then the running sum
+                counts = series[label_set] = [0] * (len(buckets) + 2)
+            counts[bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {key: list(value) if isinstance(value, list) else value for key, value in series.items()}
+                    for name, series in self._values.items()}
+
+
+def merge(snapshots):
+    total = {name: {} for name in METRICS}
+    for snapshot in snapshots:
+        for name, series in snapshot.items():
+            if name not in total:
+                continue  # Written by a different version of this module
+            for key, value in series.items():
+                current = total[name].get(key)
+                if current is None:
+                    total[name][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    total[name][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    total[name][key] = current + value
+    return total
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(values):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = values.get(name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for label_set, value in sorted(series.items()):
+            if kind == 'counter':
+                lines.append(f'{name}{{{label_set}}} {_number(value)}' if label_set else f'{name} {_number(value)}')
+                continue
+            prefix = f'{label_set},' if label_set else ''
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f'{{{label_set}}}' if label_set else ''
+            lines.append(f'{name}_sum{suffix} {_number(value[-1])}')
+            lines.append(f'{name}_count{suffix} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class SnapshotWriter:
+    """Writes this process's metrics to METRICS_DIR/<pid>.json every `interval` seconds."""
+
+    def __init__(self):
+        self.directory = None
+        self.interval = 5
+        self._owner = None
+        self._lock = threading.Lock()
+
+    def configure(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self):
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def write(self):
+        if not self.directory:
+            return
+        path = self.path()
+        with open(path + '.tmp', 'w') as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def ensure_running(self):
+        # Started on the first request of each process: threads do not survive
+        # the fork of a preloading server
+        if not self.directory or self._owner == os.getpid():
+            return
+        with self._lock:
+            if self._owner == os.getpid():
+                return
+            self._owner = os.getpid()
+            threading.Thread(target=self._run, name='metrics-writer', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except OSError:
+                logger.exception('Could not write metrics snapshot')
+
+    def collect(self):
+        """Live numbers of this process plus the latest snapshot of every other one."""
+        snapshots = [registry.snapshot()]
+        if self.directory:
+            own = self.path()
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    pass  # Being replaced right now; it is in the next scrape
+        return merge(snapshots)
+
+
+snapshots = SnapshotWriter()
+
+
+ARCHIVE = 'exited.json'
+
+
+def clear_snapshots(directory):
+    """Remove the snapshots of a previous server run (gunicorn's on_starting hook)."""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def archive_snapshot(directory, pid):
+    """Fold an exited worker's snapshot into one file (gunicorn's child_exit hook, in the master).
+
+    Its counts must keep adding up, but recycled workers would otherwise leave
+    one file each behind.
+    """
+    path = os.path.join(directory, f'{pid}.json')
+    archive = os.path.join(directory, ARCHIVE)
+    loaded = []
+    for source in (archive, path):
+        try:
+            with open(source) as f:
+                loaded.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+    with open(archive + '.tmp', 'w') as f:
+        json.dump(merge(loaded), f)
+    os.replace(archive + '.tmp', archive)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# 🗄️ SQL statements, from any engine
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    operation = statement.lstrip()[:6].upper()
+    label_set = labels(operation=operation if operation in SQL_OPERATIONS else 'OTHER')
+    registry.inc('sql_statements_total', label_set)
+    registry.observe('sql_statement_duration_seconds', time.perf_counter() - started, label_set)
+
+
+def record_outbound(upstream, endpoint, seconds, error):
+    registry.inc('outbound_requests_total', labels(upstream=upstream, endpoint=endpoint,
+                                                   outcome='error' if error else 'ok'))
+    registry.observe('outbound_request_duration_seconds', seconds, labels(upstream=upstream, endpoint=endpoint))
+
+
+def record_ocr(result, seconds=None, size=None):
+    """`result` is 'cached', 'ocr' or 'error'; `seconds` is tesseract time for fresh results."""
+    registry.inc('ocr_images_total', labels(result=result))
+    if seconds is not None:
+        registry.observe('ocr_image_duration_seconds', seconds)
+    if size is not None:
+        registry.observe('ocr_image_size_bytes', size)
+
+
+def init_metrics(app):
+    app.config.setdefault('METRICS_ENABLED', True)
+    app.config.setdefault('METRICS_TOKEN', None)
+    app.config.setdefault('METRICS_DIR', None)
+    app.config.setdefault('METRICS_FLUSH_INTERVAL', 5)
+    if not app.config['METRICS_ENABLED']:
+        return
+    snapshots.configure(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+
+    @app.before_request
+    def start_timer():
+        snapshots.ensure_running()
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        route_labels = labels(method=request.method, route=route)
+        registry.inc('http_requests_total', labels(method=request.method, route=route, status=response.status_code))
+        registry.observe('http_request_duration_seconds', time.perf_counter() - started, route_labels)
+        registry.observe('http_request_sql_statements', get_query_count(), route_labels)
+        if request.content_length:
+            registry.observe('http_request_size_bytes', request.content_length, route_labels)
+        if not response.is_streamed and response.content_length is not None:
+            registry.observe('http_response_size_bytes', response.content_length, route_labels)
+        if response.headers.get('X-Cache') in ('HIT', 'MISS'):
+            registry.inc('http_cache_total', labels(route=route, result=response.headers['X-Cache'].lower()))
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        # Meant for the scraper: keep it off the public proxy, or set METRICS_TOKEN
+        token = app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(render(snapshots.collect()), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,60 @@
+"""article excerpt
+
+Adds Article.excerpt, the plain-text preview list endpoints serve instead of
+the full body, and backfills it for existing articles. New and edited rows
+get theirs from the Article mapper events.
+
+Revision ID: 0002_article_excerpt
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:10:12.402117
+
+"""
+import html
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_article_excerpt'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+EXCERPT_LENGTH = 200
+BATCH = 1000
+
+
+def make_excerpt(body):
+    # Frozen copy of models.make_excerpt: the migration must not change with the app
+    text = html.unescape(re.sub(r'<[^>]+>', ' ', body or ''))
+    return ' '.join(text.split())[:EXCERPT_LENGTH]
+
+
+def upgrade():
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=EXCERPT_LENGTH), nullable=True))
+
+    conn = op.get_bind()
+    article = sa.table('article', sa.column('id', sa.Integer), sa.column('body', sa.Text),
+                       sa.column('excerpt', sa.String))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(article.c.id, article.c.body)
+            .where(article.c.id > last_id, article.c.excerpt.is_(None))
+            .order_by(article.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            article.update().where(article.c.id == sa.bindparam('row_id')).values(excerpt=sa.bindparam('value')),
+            [{'row_id': row.id, 'value': make_excerpt(row.body)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.drop_column('excerpt')
@@ -0,0 +1,38 @@
+"""updated_at columns
+
+Adds updated_at to article, category and sub_category (the ETag /
+Last-Modified validators). Existing rows are stamped with the migration time:
+their real edit times are unknown, and clients simply revalidate once.
+
+Revision ID: 0003_updated_at
+Revises: 0002_article_excerpt
+Create Date: 2026-10-18 09:11:40.871334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_updated_at'
+down_revision = '0002_article_excerpt'
+branch_labels = None
+depends_on = None
+
+TABLES = ('article', 'category', 'sub_category')
+
+
+def upgrade():
+    for table in TABLES:
+        # Added nullable, backfilled, then made NOT NULL (SQLite rebuilds the table for that)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,36 @@
+"""thumbnail variants
+
+Adds thumbnail_variants (resized WebP/AVIF srcsets) to article, category and
+sub_category. Existing rows are set to NULL explicitly: their thumbnails were
+stored before variants existed, and clients fall back to `thumbnail` until
+the image is uploaded again.
+
+Revision ID: 0004_thumbnail_variants
+Revises: 0003_updated_at
+Create Date: 2026-10-18 09:12:55.118902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_thumbnail_variants'
+down_revision = '0003_updated_at'
+branch_labels = None
+depends_on = None
+
+TABLES = ('article', 'category', 'sub_category')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('thumbnail_variants', sa.JSON(), nullable=True))
+        op.execute(f"UPDATE {table} SET thumbnail_variants = NULL")
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('thumbnail_variants')
@@ -0,0 +1,54 @@
+"""ocr jobs
+
+Adds the ocr_job / ocr_job_item tables behind /api/ocr/jobs. New tables:
+there is nothing to backfill.
+
+Revision ID: 0005_ocr_jobs
+Revises: 0004_thumbnail_variants
+Create Date: 2026-10-18 09:14:02.560217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_ocr_jobs'
+down_revision = '0004_thumbnail_variants'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ocr_job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('lang', sa.String(length=50), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('ocr_job_item',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.String(length=32), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('text', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['ocr_job.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ocr_job_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ocr_job_item_job_id'), ['job_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ocr_job_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ocr_job_item_job_id'))
+
+    op.drop_table('ocr_job_item')
+    op.drop_table('ocr_job')
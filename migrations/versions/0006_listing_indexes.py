@@ -0,0 +1,64 @@
+"""indexes for listing queries
+
+Adds Article.created_at / published_at (backfilled from updated_at) and the
+indexes behind the listing queries: the category foreign keys, the sort
+columns, (category_id, published_at) for category listings sorted by date,
+and updated_at, which every ETag validator reads with MAX().
+
+Revision ID: 0006_listing_indexes
+Revises: 0005_ocr_jobs
+Create Date: 2026-10-18 08:06:55.064750
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_listing_indexes'
+down_revision = '0005_ocr_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('published_at', sa.DateTime(), nullable=True))
+
+    # Best available history for existing rows
+    op.execute("UPDATE article SET created_at = updated_at, published_at = updated_at WHERE created_at IS NULL")
+
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_article_category_id'), ['category_id'], unique=False)
+        batch_op.create_index('ix_article_category_id_published_at', ['category_id', 'published_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_article_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_article_published_at'), ['published_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_article_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_category_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('sub_category', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sub_category_category_id'), ['category_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_sub_category_updated_at'), ['updated_at'], unique=False)
+
+
+
+def downgrade():
+    with op.batch_alter_table('sub_category', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sub_category_updated_at'))
+        batch_op.drop_index(batch_op.f('ix_sub_category_category_id'))
+
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_category_updated_at'))
+
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_article_updated_at'))
+        batch_op.drop_index(batch_op.f('ix_article_published_at'))
+        batch_op.drop_index(batch_op.f('ix_article_created_at'))
+        batch_op.drop_index('ix_article_category_id_published_at')
+        batch_op.drop_index(batch_op.f('ix_article_category_id'))
+        batch_op.drop_column('published_at')
+        batch_op.drop_column('created_at')
+
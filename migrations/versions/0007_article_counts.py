@@ -0,0 +1,61 @@
+"""article subcategory and counts
+
+Adds Article.subcategory_id and the denormalized article_count columns on
+category / sub_category, backfilled from the existing articles.
+
+Revision ID: 0007_article_counts
+Revises: 0006_listing_indexes
+Create Date: 2026-10-18 08:08:58.640747
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_article_counts'
+down_revision = '0006_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        # A plain ADD COLUMN with inline REFERENCES: batch mode would rebuild (copy) all of `article`
+        op.execute("ALTER TABLE article ADD COLUMN subcategory_id INTEGER REFERENCES sub_category (id)")
+    else:
+        op.add_column('article', sa.Column('subcategory_id', sa.Integer(), nullable=True))
+        op.create_foreign_key('fk_article_subcategory_id', 'article', 'sub_category',
+                              ['subcategory_id'], ['id'])
+    op.create_index(op.f('ix_article_subcategory_id'), 'article', ['subcategory_id'], unique=False)
+
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('article_count', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('sub_category', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('article_count', sa.Integer(), server_default='0', nullable=False))
+
+    # From here on the Article mapper events keep the counts in step
+    op.execute(
+        "UPDATE category SET article_count = "
+        "(SELECT COUNT(*) FROM article WHERE article.category_id = category.id)"
+    )
+    op.execute(
+        "UPDATE sub_category SET article_count = "
+        "(SELECT COUNT(*) FROM article WHERE article.subcategory_id = sub_category.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('sub_category', schema=None) as batch_op:
+        batch_op.drop_column('article_count')
+
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.drop_column('article_count')
+
+    op.drop_index(op.f('ix_article_subcategory_id'), table_name='article')
+    if op.get_bind().dialect.name != 'sqlite':
+        op.drop_constraint('fk_article_subcategory_id', 'article', type_='foreignkey')
+    # On SQLite this rebuilds the table (0008, which owns the search triggers, is already undone)
+    with op.batch_alter_table('article', schema=None) as batch_op:
+        batch_op.drop_column('subcategory_id')
@@ -0,0 +1,60 @@
+"""article search index
+
+Creates the FTS5 full-text index over article title/body (SQLite only) with
+the triggers that keep it in sync, and indexes the existing articles. Other
+databases search with ILIKE and need nothing here.
+
+Any later migration that rebuilds `article` in batch mode drops these
+triggers with the old table and must recreate them.
+
+Revision ID: 0008_article_search
+Revises: 0007_article_counts
+Create Date: 2026-10-18 09:16:31.904455
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_article_search'
+down_revision = '0007_article_counts'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of search._FTS_DDL. IF NOT EXISTS: databases created before
+# migrations may already have the index, built on first search by older code.
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5(
+        title, body,
+        content='article', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_ai AFTER INSERT ON article BEGIN
+        INSERT INTO article_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_ad AFTER DELETE ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_au AFTER UPDATE OF title, body ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO article_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for ddl in FTS_DDL:
+        op.execute(ddl)
+    # Earlier batch migrations may have rebuilt `article` under an existing index: reindex everything
+    op.execute("INSERT INTO article_fts(article_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('article_fts_au', 'article_fts_ad', 'article_fts_ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS article_fts")
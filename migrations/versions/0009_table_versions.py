@@ -0,0 +1,47 @@
+"""table versions
+
+Adds table_version, one change counter per content table that the ETag /
+Last-Modified validators read by primary key, and drops the updated_at
+indexes that only served the previous MAX(updated_at) validator. Each
+counter starts at the table's newest updated_at.
+
+Revision ID: 0009_table_versions
+Revises: 0008_article_search
+Create Date: 2026-10-18 09:40:18.220671
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_table_versions'
+down_revision = '0008_article_search'
+branch_labels = None
+depends_on = None
+
+TABLES = ('article', 'category', 'sub_category')
+
+
+def upgrade():
+    op.create_table('table_version',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    for table in TABLES:
+        op.execute(
+            f"INSERT INTO table_version (name, version, updated_at) "
+            f"SELECT '{table}', 0, COALESCE(MAX(updated_at), CURRENT_TIMESTAMP) FROM {table}"
+        )
+
+    # Plain DROP INDEX: a batch rebuild of `article` would drop the search triggers
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+
+
+def downgrade():
+    for table in TABLES:
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], unique=False)
+    op.drop_table('table_version')
@@ -0,0 +1,40 @@
+"""ocr job recovery
+
+Adds ocr_job.owner (the process running the job) and ocr_job_item.data (the
+image, kept while the item is pending) so jobs left behind by a dead worker
+can be resumed, plus the (status, updated_at) index used by the recovery and
+retention sweeps. Existing unfinished jobs get no owner and no stored images:
+the first sweep marks their pending items as failed.
+
+Revision ID: 0010_ocr_job_recovery
+Revises: 0009_table_versions
+Create Date: 2026-10-18 11:02:47.318540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_ocr_job_recovery'
+down_revision = '0009_table_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ocr_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('owner', sa.String(length=100), nullable=True))
+        batch_op.create_index('ix_ocr_job_status_updated_at', ['status', 'updated_at'], unique=False)
+
+    with op.batch_alter_table('ocr_job_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('ocr_job_item', schema=None) as batch_op:
+        batch_op.drop_column('data')
+
+    with op.batch_alter_table('ocr_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_ocr_job_status_updated_at')
+        batch_op.drop_column('owner')
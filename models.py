@@ -1,5 +1,19 @@
+import html
+import re
+from datetime import datetime, timezone
 from db import db
 
+EXCERPT_LENGTH = 200
+
+def make_excerpt(body, length=EXCERPT_LENGTH):
+    """Plain-text preview of a rich-text body (tags stripped, whitespace collapsed)."""
+    text = html.unescape(re.sub(r'<[^>]+>', ' ', body or ''))
+    return ' '.join(text.split())[:length]
+
+def utcnow():
+    # Naive UTC, which is what SQLite DateTime columns round-trip
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
@@ -10,13 +24,20 @@ class Category(db.Model):
     title = db.Column(db.String(100), nullable=False)
     slug = db.Column(db.String(100), unique=True, nullable=False)
     thumbnail = db.Column(db.String(255), nullable=True)
+    thumbnail_variants = db.Column(db.JSON, nullable=True)  # {format: {srcset, sizes}}
+    # Maintained by the Article mapper events below, so menus never need COUNT(*)
+    article_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
 
 class SubCategory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     slug = db.Column(db.String(100), unique=True, nullable=False)
     thumbnail = db.Column(db.String(255), nullable=True)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    thumbnail_variants = db.Column(db.JSON, nullable=True)  # {format: {srcset, sizes}}
+    article_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False, index=True)
     category = db.relationship('Category', backref=db.backref('subcategories', lazy=True))
 
 class Article(db.Model):
@@ -24,6 +45,137 @@ class Article(db.Model):
     title = db.Column(db.String(255), nullable=False)
     slug = db.Column(db.String(255), unique=True, nullable=False)
     body = db.Column(db.Text, nullable=False)  # Supports rich text
+    excerpt = db.Column(db.String(EXCERPT_LENGTH), nullable=True)  # Precomputed from body on write
     thumbnail = db.Column(db.String(255), nullable=True)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    thumbnail_variants = db.Column(db.JSON, nullable=True)  # {format: {srcset, sizes}}
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    # Nullable so the migration can add them with a plain ALTER TABLE (no table rebuild)
+    created_at = db.Column(db.DateTime, nullable=True, default=utcnow, index=True)
+    published_at = db.Column(db.DateTime, nullable=True, default=utcnow, index=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False, index=True)
     category = db.relationship('Category', backref=db.backref('articles', lazy=True))
+    subcategory_id = db.Column(db.Integer, db.ForeignKey('sub_category.id'), nullable=True, index=True)
+    # Deleting a subcategory detaches its articles with one UPDATE (see delete_subcategory)
+    subcategory = db.relationship('SubCategory', backref=db.backref('articles', lazy=True, passive_deletes=True))
+
+    __table_args__ = (
+        # Category listings sorted by publication date: filter and sort from one index
+        db.Index('ix_article_category_id_published_at', 'category_id', 'published_at'),
+    )
+
+
+@db.event.listens_for(Article, 'before_insert')
+def _store_excerpt(mapper, connection, target):
+    # Lets list endpoints skip loading `body` entirely
+    target.excerpt = make_excerpt(target.body)
+
+@db.event.listens_for(Article, 'before_update')
+def _refresh_excerpt(mapper, connection, target):
+    if db.inspect(target).attrs.body.history.has_changes():
+        target.excerpt = make_excerpt(target.body)
+
+def _bump_count(connection, model, row_id, delta):
+    if row_id is not None:
+        connection.execute(
+            model.__table__.update()
+            .where(model.__table__.c.id == row_id)
+            .values(article_count=model.__table__.c.article_count + delta)
+        )
+        bump_table_versions(connection, model)  # Listings serialize article_count
+
+# Article counts change in the same transaction (and flush) as the article itself
+@db.event.listens_for(Article, 'after_insert')
+def _count_inserted(mapper, connection, target):
+    _bump_count(connection, Category, target.category_id, 1)
+    _bump_count(connection, SubCategory, target.subcategory_id, 1)
+
+@db.event.listens_for(Article, 'after_delete')
+def _count_deleted(mapper, connection, target):
+    _bump_count(connection, Category, target.category_id, -1)
+    _bump_count(connection, SubCategory, target.subcategory_id, -1)
+
+@db.event.listens_for(Article, 'after_update')
+def _count_moved(mapper, connection, target):
+    state = db.inspect(target)
+    for model, attr in ((Category, 'category_id'), (SubCategory, 'subcategory_id')):
+        history = state.attrs[attr].history
+        if history.has_changes():
+            old_id = history.deleted[0] if history.deleted else None
+            if old_id != getattr(target, attr):
+                _bump_count(connection, model, old_id, -1)
+                _bump_count(connection, model, getattr(target, attr), 1)
+
+def refresh_article_counts():
+    """Recompute every article_count (after writes that bypass the ORM, e.g. bulk inserts)."""
+    for model, column in ((Category, Article.category_id), (SubCategory, Article.subcategory_id)):
+        count = db.select(db.func.count(Article.id)).where(column == model.id).scalar_subquery()
+        db.session.execute(db.update(model).values(article_count=count))
+    bump_table_versions(db.session.connection(), Category, SubCategory)
+
+class TableVersion(db.Model):
+    """Change counter per content table, read by the ETag / Last-Modified validators.
+
+    One primary-key lookup instead of COUNT(*) + MAX(updated_at) over the table,
+    and deletes are counted too.
+    """
+    name = db.Column(db.String(50), primary_key=True)  # table name
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+VERSIONED_MODELS = (Article, Category, SubCategory)
+
+@db.event.listens_for(TableVersion.__table__, 'after_create')
+def _seed_table_versions(table, connection, **kw):
+    # create_all() databases; migrated ones get their rows from 0009_table_versions
+    connection.execute(table.insert(), [{'name': model.__tablename__, 'version': 0, 'updated_at': utcnow()}
+                                        for model in VERSIONED_MODELS])
+
+def bump_table_versions(connection, *models):
+    """Record a change to `models`' tables, in the caller's transaction.
+
+    The mapper events below cover ORM writes; Core statements (bulk inserts,
+    Query.update) must call this themselves.
+    """
+    table = TableVersion.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.name.in_([model.__tablename__ for model in models]))
+        .values(version=table.c.version + 1, updated_at=utcnow())
+    )
+
+def _bump_own_table(mapper, connection, target):
+    bump_table_versions(connection, mapper.class_)
+
+for _model in VERSIONED_MODELS:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        db.event.listen(_model, _event, _bump_own_table)
+
+class OcrJob(db.Model):
+    __table_args__ = (
+        # Recovery sweeps (unfinished jobs) and retention (finished before a cutoff)
+        db.Index('ix_ocr_job_status_updated_at', 'status', 'updated_at'),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done
+    lang = db.Column(db.String(50), nullable=False)
+    total = db.Column(db.Integer, nullable=False)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    owner = db.Column(db.String(100), nullable=True)  # host:pid of the process whose pool runs it
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+class OcrJobItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('ocr_job.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    filename = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, done, error
+    text = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    # The uploaded image while the item is pending, so another process can resume it; deferred so
+    # status polls never load it
+    data = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    job = db.relationship('OcrJob', backref=db.backref('items', lazy=True, order_by='OcrJobItem.position',
+                                                       cascade='all, delete-orphan'))
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from cache import LRUCache
+
+# Content-addressed cache for OCR and translation results.
+#
+# OCR results are keyed by the SHA-256 of the uploaded bytes plus language and
+# tesseract config, translations by the SHA-256 of the text plus target
+# language. A small in-process LRU sits in front of an SQLite file so results
+# survive restarts and are shared by every worker on the box.
+
+
+def ocr_key(data, lang, config):
+    return f"ocr:{hashlib.sha256(data).hexdigest()}:{lang}:{config}"
+
+
+def translation_key(text, dest):
+    return f"tr:{hashlib.sha256(text.encode('utf-8')).hexdigest()}:{dest}"
+
+
+class ResultCache:
+    def __init__(self, app=None):
+        self.path = None
+        self.max_entries = 0
+        self.memory = LRUCache(0)
+        self._local = threading.local()
+        self._writes = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Runtime data lives in the instance folder, not next to the code; '' keeps results in memory only
+        if app.config.get('OCR_CACHE_PATH') is None:
+            app.config['OCR_CACHE_PATH'] = os.path.join(app.instance_path, 'ocr_cache.db')
+        app.config.setdefault('OCR_CACHE_MAX_ENTRIES', 10000)
+        app.config.setdefault('OCR_CACHE_MEMORY_ENTRIES', 512)
+
+        self.path = app.config['OCR_CACHE_PATH']
+        self.max_entries = app.config['OCR_CACHE_MAX_ENTRIES']
+        self.memory = LRUCache(app.config['OCR_CACHE_MEMORY_ENTRIES'], default_ttl=0)
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS result_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_result_cache_last_access ON result_cache (last_access)")
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections must not be shared
+        # (re-opened after a fork: a preloading server must not share the parent's handle)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'owner', None) != (self.path, os.getpid()):
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.owner = conn, (self.path, os.getpid())
+        return conn
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or not self.path:
+            return value
+
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM result_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE result_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.memory.set(key, row[0])
+        return row[0]
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if not self.path:
+            return
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, value, last_access) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used rows beyond OCR_CACHE_MAX_ENTRIES."""
+        if not self.path or not self.max_entries:
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM result_cache WHERE key IN ("
+                "SELECT key FROM result_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+ocr_cache = ResultCache()
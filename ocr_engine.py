@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+# Tesseract work shared by the OCR routes and background jobs.
+#
+# `ocr_image_bytes` is a plain top-level function over bytes so it can run in a
+# worker process: tesseract is CPU-bound and running it on the request thread
+# pins a Flask worker for the whole batch. The pool is created lazily on first
+# use and shared by everything in this process.
+
+OCR_CONFIG = r'--oem 3 --psm 6'
+DEFAULT_LANG = 'eng+khm'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class OcrError(Exception):
+    """Picklable stand-in for errors raised inside a worker process.
+
+    Some library exceptions (e.g. pytesseract's TesseractNotFoundError) cannot be
+    unpickled, which would break the whole pool instead of failing one image.
+    """
+
+
+def preprocess(image):
+    from PIL import ImageFilter
+
+    image = image.convert("L")
+    return image.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))  # Auto-enhance
+
+
+def ocr_image_bytes(data, lang=DEFAULT_LANG, config=OCR_CONFIG):
+    import pytesseract
+    from PIL import Image
+
+    try:
+        image = preprocess(Image.open(BytesIO(data)))
+        return pytesseract.image_to_string(image, lang=lang, config=config).strip()
+    except Exception as e:
+        raise OcrError(str(e)) from None
+
+
+def ocr_image_timed(data, lang=DEFAULT_LANG, config=OCR_CONFIG):
+    """`(text, seconds)`: the time is measured where tesseract ran, queueing excluded."""
+    started = time.perf_counter()
+    text = ocr_image_bytes(data, lang, config)
+    return text, time.perf_counter() - started
+
+
+def get_pool(max_workers=None):
+    """Process pool for OCR; `max_workers` defaults to the CPU count."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = max_workers or os.cpu_count() or 1
+            # spawn: forking a threaded web worker can deadlock the child
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_pool(broken=None):
+    """Shut the pool down; with `broken`, only if that pool is still the current one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (broken is None or _pool is broken):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def submit_ocr(data, lang=DEFAULT_LANG, config=OCR_CONFIG, max_workers=None):
+    """Queue one image on the pool; returns a future of `(text, seconds)`.
+
+    A worker process that dies (e.g. tesseract crashing) breaks the whole
+    executor and every later submit would fail, so a broken pool is replaced
+    and the submit retried once.
+    """
+    pool = get_pool(max_workers)
+    try:
+        return pool.submit(ocr_image_timed, data, lang, config)
+    except BrokenProcessPool:
+        shutdown_pool(broken=pool)
+        return get_pool(max_workers).submit(ocr_image_timed, data, lang, config)
+
+
+def iter_ocr(images, lang=DEFAULT_LANG, concurrency=None, max_workers=None, cache=None):
+    """OCR `images` (a list of (filename, bytes)) in parallel, yielding as each finishes.
+
+    Yields `(position, filename, text, error)` in completion order. At most
+    `concurrency` images are in flight at once, so one big batch cannot
+    monopolise the pool. Results already in `cache` are yielded straight away
+    and fresh ones are stored there. Closing the generator early (client went
+    away) cancels everything not yet started.
+    """
+    from metrics import record_ocr
+    from ocr_cache import ocr_key
+
+    limit = max(1, concurrency or os.cpu_count() or 1)
+    pending = {}
+    hits = []
+    queue = iter(enumerate(images))
+
+    def fill():
+        for position, (filename, data) in queue:
+            key = ocr_key(data, lang, OCR_CONFIG) if cache else None
+            text = cache.get(key) if cache else None
+            if text is not None:
+                record_ocr('cached', size=len(data))
+                hits.append((position, filename, text, None))
+                continue
+            pending[submit_ocr(data, lang, OCR_CONFIG, max_workers)] = (position, filename, key, len(data))
+            if len(pending) >= limit:
+                break
+
+    try:
+        fill()
+        while hits or pending:
+            while hits:
+                yield hits.pop(0)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                position, filename, key, size = pending.pop(future)
+                try:
+                    text, seconds = future.result()
+                except Exception as e:
+                    # One unreadable image must not abort the rest of the batch
+                    record_ocr('error', size=size)
+                    yield position, filename, None, str(e)
+                    continue
+                record_ocr('ocr', seconds, size)
+                if cache:
+                    cache.set(key, text)
+                yield position, filename, text, None
+            fill()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,226 @@
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+from functools import partial
+from flask import current_app
+from db import db
+from models import OcrJob, OcrJobItem, utcnow
+from metrics import record_ocr
+from ocr_engine import OCR_CONFIG, submit_ocr
+from ocr_cache import ocr_cache, ocr_key
+
+# Background OCR jobs.
+#
+# Submitting a job stores one row per image in SQLite and hands the images to
+# the OCR process pool; the request returns immediately with the job id. The
+# pool's done-callbacks run on its management thread, which must stay free to
+# feed the workers, so they only queue each result; a dedicated writer thread
+# stores them, and any web worker can answer status requests from the database.
+#
+# The pool lives in the web worker that accepted the job, so a recycled or
+# crashed worker takes its queue with it. Jobs therefore record their owner
+# (host:pid) and keep each pending image in the database until it is done; the
+# periodic sweep resumes jobs whose owner is gone and deletes finished jobs once
+# they are older than OCR_JOB_RETENTION_HOURS.
+
+UNFINISHED = ('queued', 'running')
+
+_last_sweep = None
+_sweep_lock = threading.Lock()
+
+_results = queue.Queue()
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def process_owner():
+    # Computed per call: a forked worker has a new pid
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _owner_alive(owner):
+    if owner is None:
+        return False
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname() or os.name == 'nt':
+        return True  # Cannot check another machine's processes: leave its jobs alone
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+def submit_job(images, lang):
+    """Queue OCR for `images` (a list of (filename, bytes)); returns the OcrJob."""
+    app = current_app._get_current_object()
+    job = OcrJob(id=uuid.uuid4().hex, lang=lang, total=len(images), status='queued', completed=0, failed=0,
+                 owner=process_owner())
+    work = []
+    for position, (filename, data) in enumerate(images):
+        key = ocr_key(data, lang, OCR_CONFIG)
+        text = ocr_cache.get(key)
+        item = OcrJobItem(position=position, filename=filename)
+        if text is not None:
+            # Already OCR'd this exact image: finished before it is even queued
+            item.text, item.status = text, 'done'
+            job.completed += 1
+            record_ocr('cached', size=len(data))
+        else:
+            item.data = data
+            work.append((item, data, key))
+        job.items.append(item)
+
+    if not work:
+        job.status = 'done'
+    db.session.add(job)
+    db.session.commit()
+
+    _enqueue(app, job, [(item.id, data, key) for item, data, key in work])
+    return job
+
+
+def _enqueue(app, job, work):
+    _ensure_writer()
+    for item_id, data, key in work:
+        future = submit_ocr(data, job.lang, OCR_CONFIG, app.config.get('OCR_WORKERS'))
+        future.add_done_callback(partial(_queue_result, app, job.id, item_id, key, len(data)))
+
+
+def _queue_result(app, job_id, item_id, cache_key, size, future):
+    # Runs on the executor's management thread: hand off, no database work here
+    _results.put((app, job_id, item_id, cache_key, size, future))
+
+
+def _ensure_writer():
+    # One writer per process; checked by pid since a forked worker does not inherit the thread
+    global _writer_pid
+    with _writer_lock:
+        if _writer_pid != os.getpid():
+            threading.Thread(target=_write_results, name='ocr-job-writer', daemon=True).start()
+            _writer_pid = os.getpid()
+
+
+def _write_results():
+    while True:
+        app, job_id, *result = _results.get()
+        try:
+            _record_result(app, job_id, *result)
+        except Exception:
+            # The app context's teardown already discarded the failed session
+            app.logger.exception('Could not record OCR result for job %s', job_id)
+
+
+def _record_result(app, job_id, item_id, cache_key, size, future):
+    # Runs on the writer thread, one result at a time
+    with app.app_context():
+        item = db.session.get(OcrJobItem, item_id)
+        job = db.session.get(OcrJob, job_id)
+        if item is None or job is None or item.status != 'pending':
+            return  # Deleted, or already recorded by a process that resumed the job
+
+        try:
+            item.text, seconds = future.result()
+            item.status = 'done'
+            ocr_cache.set(cache_key, item.text)
+            job.completed += 1
+            record_ocr('ocr', seconds, size)
+        except Exception as e:
+            record_ocr('error', size=size)
+            item.error = str(e)
+            item.status = 'error'
+            job.failed += 1
+
+        item.data = None  # The image is only kept until its result is in
+        job.status = 'done' if job.completed + job.failed >= job.total else 'running'
+        db.session.commit()
+
+
+def resume_orphaned_jobs(app):
+    """Take over unfinished jobs whose owning process is gone; returns how many were resumed."""
+    me = process_owner()
+    resumed = 0
+    for job_id, owner in db.session.query(OcrJob.id, OcrJob.owner).filter(OcrJob.status.in_(UNFINISHED)).all():
+        if owner == me or _owner_alive(owner):
+            continue
+        # Claimed with a compare-and-set, so only one of the workers sweeping at once takes it
+        claimed = db.session.query(OcrJob).filter(OcrJob.id == job_id, OcrJob.owner == owner) \
+            .update({OcrJob.owner: me}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            continue
+
+        job = db.session.get(OcrJob, job_id)
+        work = []
+        for item_id, data in db.session.query(OcrJobItem.id, OcrJobItem.data) \
+                .filter(OcrJobItem.job_id == job_id, OcrJobItem.status == 'pending'):
+            if data is None:
+                # Queued before images were stored: nothing to resume from
+                db.session.query(OcrJobItem).filter(OcrJobItem.id == item_id).update(
+                    {OcrJobItem.status: 'error', OcrJobItem.error: 'Interrupted; submit the image again'},
+                    synchronize_session=False)
+                job.failed += 1
+            else:
+                work.append((item_id, data, ocr_key(data, job.lang, OCR_CONFIG)))
+        job.status = 'done' if job.completed + job.failed >= job.total else 'running'
+        db.session.commit()
+        _enqueue(app, job, work)
+        app.logger.info('Resumed OCR job %s from %s (%d images)', job_id, owner or 'unknown owner', len(work))
+        resumed += 1
+    return resumed
+
+
+def purge_finished_jobs(retention_hours):
+    """Delete jobs that finished more than `retention_hours` ago; returns how many."""
+    cutoff = utcnow() - timedelta(hours=retention_hours)
+    expired = db.select(OcrJob.id).where(OcrJob.status == 'done', OcrJob.updated_at < cutoff)
+    db.session.query(OcrJobItem).filter(OcrJobItem.job_id.in_(expired)).delete(synchronize_session=False)
+    purged = db.session.query(OcrJob).filter(OcrJob.id.in_(expired)).delete(synchronize_session=False)
+    db.session.commit()
+    return purged
+
+
+def maybe_sweep_jobs():
+    """Resume orphaned jobs and purge old ones, at most every OCR_JOB_SWEEP_INTERVAL seconds per process."""
+    global _last_sweep
+    app = current_app._get_current_object()
+    interval = app.config.get('OCR_JOB_SWEEP_INTERVAL', 300)
+    if _last_sweep is not None and time.monotonic() - _last_sweep < interval:
+        return
+    if not _sweep_lock.acquire(blocking=False):
+        return  # Another thread of this process is sweeping
+    try:
+        _last_sweep = time.monotonic()
+        resume_orphaned_jobs(app)
+        if app.config.get('OCR_JOB_RETENTION_HOURS'):
+            purge_finished_jobs(app.config['OCR_JOB_RETENTION_HOURS'])
+    except Exception:
+        db.session.rollback()
+        app.logger.exception('OCR job sweep failed')
+    finally:
+        _sweep_lock.release()
+
+
+def serialize_job(job):
+    finished = job.completed + job.failed
+    return {
+        'id': job.id,
+        'status': job.status,
+        'lang': job.lang,
+        'total': job.total,
+        'completed': job.completed,
+        'failed': job.failed,
+        'progress': round(finished / job.total, 3) if job.total else 1.0,
+        'results': [{
+            'filename': item.filename,
+            'status': item.status,
+            'text': item.text,
+            'error': item.error
+        } for item in job.items]
+    }
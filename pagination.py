@@ -0,0 +1,81 @@
+import base64
+import json
+
+# Keyset (cursor) pagination.
+#
+# Instead of `LIMIT/OFFSET` + `COUNT(*)`, each page remembers the key of its
+# first and last row and the next request asks for rows strictly after/before
+# that key. With an index on the key column every page costs the same, no
+# matter how deep the client has scrolled.
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value):
+    raw = json.dumps({'k': value}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, key_type=None):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))['k']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    # A hand-made cursor must not reach the database as a list or object (bool is an int, too)
+    if key_type is not None and (type(key) is bool or not isinstance(key, key_type)):
+        raise InvalidCursor('Invalid cursor')
+    return key
+
+
+def wants_cursor(args):
+    return 'after' in args or 'before' in args or args.get('paginate') == 'cursor'
+
+
+def keyset_paginate(query, key_column, limit, after=None, before=None, descending=False):
+    """Fetch one page of `query` ordered by `key_column`.
+
+    `after`/`before` are opaque tokens from a previous page's `next_cursor` /
+    `prev_cursor`. Returns `(items, next_cursor, prev_cursor)`; a cursor is
+    None when there is nothing further in that direction.
+    """
+    if after and before:
+        raise InvalidCursor('Use either after or before, not both')
+
+    forward = before is None
+    key_type = key_column.type.python_type
+    if after:
+        key = decode_cursor(after, key_type)
+        query = query.filter(key_column < key if descending else key_column > key)
+    elif before:
+        key = decode_cursor(before, key_type)
+        query = query.filter(key_column > key if descending else key_column < key)
+
+    # Walking backwards means reading the index in the opposite direction
+    ascending = (not descending) if forward else descending
+    query = query.order_by(key_column.asc() if ascending else key_column.desc())
+
+    # One extra row tells us whether another page exists without a COUNT
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+
+    if not rows:
+        return rows, None, None
+
+    key_name = key_column.key
+    first_key = getattr(rows[0], key_name)
+    last_key = getattr(rows[-1], key_name)
+
+    if forward:
+        next_cursor = encode_cursor(last_key) if has_more else None
+        prev_cursor = encode_cursor(first_key) if after else None
+    else:
+        next_cursor = encode_cursor(last_key)
+        prev_cursor = encode_cursor(first_key) if has_more else None
+
+    return rows, next_cursor, prev_cursor
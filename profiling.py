@@ -0,0 +1,258 @@
+import cProfile
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request
+
+# Sampled request profiling (opt-in with PROFILING_ENABLED).
+#
+# A request is profiled when it wins the PROFILE_SAMPLE_RATE draw, or when it
+# carries `X-Profile: 1|stack|cprofile|both` together with a valid admin JWT.
+# PROFILE_ENDPOINTS narrows the draw to the listed endpoints. Unsampled
+# requests pay for one random() call; with profiling disabled nothing is
+# installed at all.
+#
+# Two recorders:
+#   stack     a shared thread reads the profiled threads' stacks every
+#             PROFILE_INTERVAL_MS and counts them as collapsed stacks
+#             ("root;caller;callee count"), ready for flamegraph.pl or
+#             speedscope. Cheap enough to leave on in production.
+#   cprofile  deterministic cProfile of the request, saved as pstats. Exact
+#             call counts, but it slows the profiled request down noticeably.
+#
+# Profiles are files in PROFILE_DIR, shared by all workers, and only the
+# newest PROFILE_MAX_STORED are kept. Download them from /api/profiles. The
+# body of a streamed response runs after the profile has ended.
+
+MODES = ('stack', 'cprofile', 'both')
+PROFILE_HEADER = 'X-Profile'
+
+
+def _frame_name(code):
+    path = code.co_filename.replace(os.sep, '/').rsplit('/', 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """One thread per process sampling the stacks of the threads registered with it."""
+
+    def __init__(self):
+        self.interval = 0.005
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._owner = None
+
+    def _ensure_thread(self):
+        # Threads do not survive the fork of a preloading server: one per process
+        if self._owner != os.getpid():
+            self._owner = os.getpid()
+            threading.Thread(target=self._run, name='profile-sampler', daemon=True).start()
+
+    def start(self):
+        with self._lock:
+            self._ensure_thread()
+            self._threads[threading.get_ident()] = Counter()
+        self._wake.set()
+
+    def stop(self):
+        with self._lock:
+            return self._threads.pop(threading.get_ident(), Counter())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                watched = list(self._threads.items())
+            if not watched:
+                # Nothing to profile: sleep until the next profiled request
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for ident, stacks in watched:
+                frame = frames.get(ident)
+                if frame is not None:
+                    stacks[collapse(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+sampler = StackSampler()
+
+
+class ProfileStore:
+    """Profiles on disk: <id>.json (metadata), <id>.pstats, <id>.collapsed."""
+
+    def __init__(self):
+        self.directory = None
+        self.max_stored = 50
+
+    def configure(self, directory, max_stored):
+        self.directory = directory
+        self.max_stored = max_stored
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, meta, profile=None, stacks=None):
+        # Millisecond timestamp first, so ids sort by age
+        profile_id = f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}'
+        base = os.path.join(self.directory, profile_id)
+        meta = dict(meta, id=profile_id, files=[])
+        if profile is not None:
+            profile.dump_stats(base + '.pstats')
+            meta['files'].append('pstats')
+        if stacks is not None:
+            with open(base + '.collapsed', 'w') as f:
+                f.writelines(f'{stack} {count}\n' for stack, count in stacks.most_common())
+            meta['files'].append('collapsed')
+        # Metadata last: a profile is listed only once its files are complete
+        with open(base + '.json.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(base + '.json.tmp', base + '.json')
+        self.prune()
+        return profile_id
+
+    def _ids(self):
+        return sorted((os.path.basename(path)[:-5] for path in glob.glob(os.path.join(self.directory, '*.json'))),
+                      reverse=True)
+
+    def prune(self):
+        for profile_id in self._ids()[self.max_stored:]:
+            for path in glob.glob(os.path.join(self.directory, f'{profile_id}.*')):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # Another worker pruned it first
+
+    def list(self):
+        profiles = []
+        for profile_id in self._ids():
+            meta = self.get(profile_id)
+            if meta is not None:
+                profiles.append(meta)
+        return profiles
+
+    def get(self, profile_id):
+        try:
+            with open(self.path(profile_id, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def path(self, profile_id, kind):
+        return os.path.join(self.directory, f'{profile_id}.{kind}')
+
+
+store = ProfileStore()
+
+
+def _requested_mode(app):
+    """Recording mode for the current request, or None to leave it alone."""
+    requested = request.headers.get(PROFILE_HEADER)
+    if requested:
+        mode = app.config['PROFILE_MODE'] if requested == '1' else requested
+        if mode in MODES and _is_admin():
+            return mode
+        return None
+
+    endpoints = app.config['PROFILE_ENDPOINTS']
+    if endpoints and request.endpoint not in endpoints:
+        return None
+    if random.random() < app.config['PROFILE_SAMPLE_RATE']:
+        return app.config['PROFILE_MODE']
+    return None
+
+
+def _is_admin():
+    try:
+        return verify_jwt_in_request(optional=True) is not None
+    except Exception:
+        return False  # Bad or expired token: serve the request, just don't profile it
+
+
+def _start(mode):
+    profile = None
+    if mode in ('cprofile', 'both'):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            profile = None  # Another profiler is already active in this process (Python 3.12+)
+            if mode == 'cprofile':
+                return None
+    if mode in ('stack', 'both'):
+        sampler.start()
+    return {'mode': mode, 'profile': profile, 'started': time.perf_counter()}
+
+
+def _finish(session):
+    if session['profile'] is not None:
+        session['profile'].disable()
+    stacks = sampler.stop() if session['mode'] in ('stack', 'both') else None
+    return session['profile'], stacks, (time.perf_counter() - session['started']) * 1000
+
+
+def init_profiling(app):
+    app.config.setdefault('PROFILING_ENABLED', False)
+    app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+    app.config.setdefault('PROFILE_MODE', 'stack')
+    app.config.setdefault('PROFILE_ENDPOINTS', [])
+    app.config.setdefault('PROFILE_INTERVAL_MS', 5)
+    app.config.setdefault('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'blog-api-profiles'))
+    app.config.setdefault('PROFILE_MAX_STORED', 50)
+    if not app.config['PROFILING_ENABLED']:
+        return
+    if app.config['PROFILE_MODE'] not in MODES:
+        raise ValueError(f"Unknown PROFILE_MODE '{app.config['PROFILE_MODE']}' (expected one of {', '.join(MODES)})")
+
+    sampler.interval = app.config['PROFILE_INTERVAL_MS'] / 1000
+    store.configure(app.config['PROFILE_DIR'], app.config['PROFILE_MAX_STORED'])
+
+    @app.before_request
+    def start_profile():
+        mode = _requested_mode(app)
+        if mode is not None:
+            g.profile_session = _start(mode)
+
+    @app.after_request
+    def save_profile(response):
+        session = g.pop('profile_session', None)
+        if session is None:
+            return response
+        profile, stacks, elapsed_ms = _finish(session)
+        profile_id = store.save({
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(elapsed_ms, 2),
+            'mode': session['mode'],
+            'samples': sum(stacks.values()) if stacks is not None else None,
+            'pid': os.getpid(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }, profile, stacks)
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def stop_profile(error=None):
+        # after_request did not run (the request failed before a response existed)
+        session = g.pop('profile_session', None)
+        if session is not None:
+            _finish(session)
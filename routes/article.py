@@ -1,19 +1,114 @@
-import os
-from flask import Blueprint, request, jsonify, url_for
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required
-from models import db, Article, Category
-from werkzeug.utils import secure_filename
+from sqlalchemy.orm import joinedload, load_only
+from cache import cache
+from conditional import conditional, table_versions
+from models import db, Article, Category, SubCategory, make_excerpt
+from search import matching_ids_clause, search_article_ids
+from pagination import InvalidCursor, keyset_paginate, wants_cursor
+from images import save_thumbnail, release_thumbnail
+from uploads import UploadError
+from tts_audio import article_speech_text, audio_cache
 
 article_bp = Blueprint('article', __name__)
 
-UPLOAD_FOLDER = 'static/uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+# Fields a client may request with ?fields=a,b,c (and the columns they need)
+ARTICLE_FIELDS = {
+    'id': Article.id,
+    'title': Article.title,
+    'slug': Article.slug,
+    'body': Article.body,
+    'excerpt': Article.excerpt,
+    'thumbnail': Article.thumbnail,
+    'thumbnail_variants': Article.thumbnail_variants,
+    'category_id': Article.category_id,
+    'category_title': Article.category_id,
+    'subcategory_id': Article.subcategory_id,
+    'created_at': Article.created_at,
+    'published_at': Article.published_at,
+}
+DEFAULT_FIELDS = ('id', 'title', 'slug', 'body', 'thumbnail', 'thumbnail_variants', 'category_id', 'category_title',
+                  'subcategory_id', 'published_at')
+SUMMARY_FIELDS = ('id', 'title', 'slug', 'excerpt', 'thumbnail', 'thumbnail_variants', 'category_id', 'category_title',
+                  'subcategory_id', 'published_at')
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# ?sort= for page-numbered listings; every ordering is backed by an index
+SORT_ORDERS = {
+    'id': (Article.id.asc(),),
+    'published': (Article.published_at.desc(), Article.id.desc()),
+    'created': (Article.created_at.desc(), Article.id.desc()),
+}
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+def parse_fields(default=DEFAULT_FIELDS):
+    """Read ?fields= (comma separated, or `summary`); unknown names are ignored."""
+    raw = request.args.get('fields')
+    if not raw:
+        return default
+    if raw == 'summary':
+        return SUMMARY_FIELDS
+    fields = tuple(f for f in (name.strip() for name in raw.split(',')) if f in ARTICLE_FIELDS)
+    return fields or default
+
+def article_query(fields=DEFAULT_FIELDS):
+    """Article query that only loads the columns `fields` need.
+
+    Unrequested columns (usually the full `body`) stay out of the SELECT, and the
+    category is joined only when its title is serialized.
+    """
+    columns = {Article.id} | {ARTICLE_FIELDS[f] for f in fields}
+    query = Article.query.options(load_only(*columns))
+    if 'category_title' in fields:
+        # Categories are joined in the same SELECT; lazy loading costs one query per row
+        query = query.options(joinedload(Article.category).load_only(Category.title))
+    return query
+
+def pregenerate_audio(article):
+    # Warm the TTS cache in the background so the first listener doesn't wait
+    if current_app.config.get('TTS_PREGENERATE'):
+        audio_cache.pregenerate(article_speech_text(article.title, article.body),
+                                current_app.config['TTS_ARTICLE_LANG'])
+
+def stored_excerpt(a):
+    # Rows written before excerpts were stored have NULL until the migration backfills them;
+    # reading `body` then costs one extra query for that row
+    return a.excerpt if a.excerpt is not None else make_excerpt(a.body)
+
+def serialize_article(a, fields=DEFAULT_FIELDS):
+    data = {}
+    for field in fields:
+        if field == 'category_title':
+            data[field] = a.category.title if a.category else None
+        elif field == 'excerpt':
+            data[field] = stored_excerpt(a)
+        elif field in ('created_at', 'published_at'):
+            value = getattr(a, field)
+            data[field] = value.isoformat() if value else None
+        else:
+            data[field] = getattr(a, field)
+    return data
+
+def validate_subcategory(subcategory_id, category_id):
+    """Error response if `subcategory_id` is unknown or outside the category, else None."""
+    subcategory = SubCategory.query.get(subcategory_id)
+    if not subcategory:
+        return jsonify({'message': 'Subcategory not found'}), 404
+    if str(subcategory.category_id) != str(category_id):
+        return jsonify({'message': 'Subcategory does not belong to this category'}), 400
+    return None
+
+def invalidate_article_caches():
+    # Article writes change the article_count shown in category/subcategory listings
+    cache.invalidate('articles', 'categories', 'subcategories')
+
+def article_version(slug):
+    """Validator for a single article: its own and its category's last change."""
+    row = (db.session.query(Article.id, Article.updated_at, Category.updated_at)
+           .outerjoin(Category, Article.category_id == Category.id)
+           .filter(Article.slug == slug).first())
+    if row is None:
+        return None
+    stamps = [ts for ts in (row[1], row[2]) if ts is not None]
+    return f'{row[0]}@{row[1]}@{row[2]}', max(stamps) if stamps else None
 
 # ✅ Create Article
 @article_bp.route('/articles', methods=['POST'])
@@ -23,6 +118,7 @@ def create_article():
     slug = request.form.get('slug')
     body = request.form.get('body')
     category_id = request.form.get('category_id')
+    subcategory_id = request.form.get('subcategory_id') or None
     file = request.files.get('thumbnail')
 
     if not title or not slug or not body or not category_id:
@@ -31,79 +127,173 @@ def create_article():
     category = Category.query.get(category_id)
     if not category:
         return jsonify({'message': 'Category not found'}), 404
+    if subcategory_id:
+        error = validate_subcategory(subcategory_id, category_id)
+        if error:
+            return error
 
-    thumbnail_path = None
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        thumbnail_path = url_for('static', filename=f'uploads/{filename}', _external=True)
+    try:
+        thumbnail_path, thumbnail_variants = save_thumbnail(file)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
 
     article = Article(
-        title=title, slug=slug, body=body, 
-        thumbnail=thumbnail_path, category_id=category_id
+        title=title, slug=slug, body=body,
+        thumbnail=thumbnail_path, thumbnail_variants=thumbnail_variants, category_id=category_id,
+        subcategory_id=int(subcategory_id) if subcategory_id else None
     )
     db.session.add(article)
     db.session.commit()
+    invalidate_article_caches()
+    pregenerate_audio(article)
 
-    return jsonify({'message': 'Article created successfully', 'thumbnail': thumbnail_path}), 201
+    return jsonify({
+        'message': 'Article created successfully',
+        'thumbnail': thumbnail_path,
+        'thumbnail_variants': thumbnail_variants
+    }), 201
 
 # ✅ Get Paginated Articles
 @article_bp.route('/articles', methods=['GET'])
+@conditional(lambda: table_versions(Article, Category))
+@cache.cached('articles', 'categories')
 def get_articles():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     search_query = request.args.get('search', '')
+    category_id = request.args.get('category_id', type=int)
+    fields = parse_fields()
 
-    query = Article.query
+    query = article_query(fields)
+    if category_id:
+        query = query.filter(Article.category_id == category_id)
     if search_query:
-        query = query.filter(Article.title.ilike(f"%{search_query}%"))
+        # Served by the FTS index instead of a `%q%` scan over the whole table
+        query = query.filter(matching_ids_clause(search_query))
 
-    paginated_articles = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Cursor mode: ?paginate=cursor for the first page, then ?after=/?before=
+    if wants_cursor(request.args):
+        per_page = min(max(per_page, 1), 100)
+        try:
+            items, next_cursor, prev_cursor = keyset_paginate(
+                query, Article.id, per_page,
+                after=request.args.get('after'), before=request.args.get('before')
+            )
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+
+        # Counting is what makes OFFSET paging slow, so it is opt-in here
+        total_pages = None
+        if request.args.get('with_total', type=int):
+            total_pages = -(-query.order_by(None).count() // per_page)
+
+        return jsonify({
+            'articles': [serialize_article(a, fields) for a in items],
+            'total_pages': total_pages,
+            'current_page': None,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        })
+
+    sort = request.args.get('sort', 'id')
+    if sort not in SORT_ORDERS:
+        return jsonify({'message': f"Invalid sort, expected one of: {', '.join(SORT_ORDERS)}"}), 400
+    paginated_articles = query.order_by(*SORT_ORDERS[sort]).paginate(page=page, per_page=per_page, error_out=False)
 
     return jsonify({
-        'articles': [{
-            'id': a.id,
-            'title': a.title,
-            'slug': a.slug,
-            'body': a.body,
-            'thumbnail': a.thumbnail,
-            'category_id': a.category_id,
-            'category_title': a.category.title if a.category else None
-        } for a in paginated_articles.items],
+        'articles': [serialize_article(a, fields) for a in paginated_articles.items],
         'total_pages': paginated_articles.pages,
         'current_page': paginated_articles.page
     })
+
+def scoped_listing(scope_name, scope, condition):
+    """Cursor-paginated articles matching `condition`, newest first.
+
+    Served from the (category_id / subcategory_id, id) index; the scope's
+    stored article_count replaces a COUNT(*) for page totals.
+    """
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+    fields = parse_fields(SUMMARY_FIELDS)
+    try:
+        items, next_cursor, prev_cursor = keyset_paginate(
+            article_query(fields).filter(condition), Article.id, per_page,
+            after=request.args.get('after'), before=request.args.get('before'), descending=True
+        )
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify({
+        scope_name: {'id': scope.id, 'title': scope.title, 'slug': scope.slug, 'article_count': scope.article_count},
+        'articles': [serialize_article(a, fields) for a in items],
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    })
+
+# ✅ Articles in a Category
+@article_bp.route('/categories/<slug>/articles', methods=['GET'])
+@conditional(lambda slug: table_versions(Article, Category))
+@cache.cached('articles', 'categories')
+def get_category_articles(slug):
+    category = Category.query.filter_by(slug=slug).first()
+    if not category:
+        return jsonify({'message': 'Category not found'}), 404
+    return scoped_listing('category', category, Article.category_id == category.id)
+
+# ✅ Articles in a Subcategory
+@article_bp.route('/subcategories/<slug>/articles', methods=['GET'])
+@conditional(lambda slug: table_versions(Article, SubCategory, Category))
+@cache.cached('articles', 'subcategories', 'categories')
+def get_subcategory_articles(slug):
+    subcategory = SubCategory.query.filter_by(slug=slug).first()
+    if not subcategory:
+        return jsonify({'message': 'Subcategory not found'}), 404
+    return scoped_listing('subcategory', subcategory, Article.subcategory_id == subcategory.id)
+
+# ✅ Full-Text Search (ranked by relevance, prefix matching)
+@article_bp.route('/articles/search', methods=['GET'])
+@conditional(lambda: table_versions(Article, Category))
+@cache.cached('articles', 'categories')
+def search_articles():
+    search_query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+    fields = parse_fields()
+
+    if not search_query:
+        return jsonify({'message': 'Query parameter q is required'}), 400
+
+    ids = search_article_ids(search_query, limit=per_page, offset=(page - 1) * per_page)
+    articles_by_id = {a.id: a for a in article_query(fields).filter(Article.id.in_(ids)).all()} if ids else {}
+
+    return jsonify({
+        'articles': [serialize_article(articles_by_id[i], fields) for i in ids if i in articles_by_id],
+        'current_page': page,
+        'query': search_query
+    })
 # ✅ Get Article by Slug
 @article_bp.route('/articles/<slug>', methods=['GET'])
+@conditional(article_version)
+@cache.cached('articles', 'categories')
 def get_article_by_slug(slug):
-    article = Article.query.filter_by(slug=slug).first()
+    fields = parse_fields()
+    article = article_query(fields).filter_by(slug=slug).first()
     if not article:
         return jsonify({'message': 'Article not found'}), 404
 
-    return jsonify({
-        'id': article.id,
-        'title': article.title,
-        'slug': article.slug,
-        'body': article.body,
-        'thumbnail': article.thumbnail,
-        'category_id': article.category_id,
-        'category_title': article.category.title if article.category else None
-    })
+    return jsonify(serialize_article(article, fields))
 # ✅ Get Last 3 Articles for Hero Section
 @article_bp.route('/articles/latest', methods=['GET'])
+@conditional(lambda: table_versions(Article, Category))
+@cache.cached('articles', 'categories')
 def get_latest_articles():
-    latest_articles = Article.query.order_by(Article.id.desc()).limit(3).all()
+    # The hero only shows a preview, so the stored excerpt replaces the full body
+    latest_articles = article_query(SUMMARY_FIELDS).order_by(*SORT_ORDERS['published']).limit(3).all()
 
     return jsonify({
         'articles': [{
-            'id': a.id,
-            'title': a.title,
-            'slug': a.slug,
-            'body': a.body[:200] + '...',  # Limit preview text
-            'thumbnail': a.thumbnail,
-            'category_id': a.category_id,
-            'category_title': a.category.title if a.category else None
+            **serialize_article(a, SUMMARY_FIELDS),
+            # Limit preview text (rows without a stored excerpt keep the old body[:200] preview)
+            'body': (a.excerpt if a.excerpt is not None else a.body[:200]) + '...',
         } for a in latest_articles]
     })
 
@@ -122,18 +312,36 @@ def update_article(id):
         slug = data.get('slug', article.slug)
         body = data.get('body', article.body)
         category_id = data.get('category_id', article.category_id)
+        subcategory_sent = 'subcategory_id' in data
+        subcategory_id = data.get('subcategory_id')
     else:
         title = request.form.get('title', article.title)
         slug = request.form.get('slug', article.slug)
         body = request.form.get('body', article.body)
         category_id = request.form.get('category_id', article.category_id)
+        subcategory_sent = 'subcategory_id' in request.form
+        subcategory_id = request.form.get('subcategory_id')
 
     # Validate category
-    if category_id and category_id != article.category_id:
+    category_changed = False
+    if category_id and str(category_id) != str(article.category_id):
         category = Category.query.get(category_id)
         if not category:
             return jsonify({'message': 'Category not found'}), 404
         article.category_id = category_id
+        category_changed = True
+
+    # Validate subcategory, only when one is sent (an empty value detaches the article).
+    # Moving to another category without naming one detaches it: the current subcategory
+    # belongs to the old category.
+    if subcategory_sent:
+        if subcategory_id:
+            error = validate_subcategory(subcategory_id, article.category_id)
+            if error:
+                return error
+        article.subcategory_id = int(subcategory_id) if subcategory_id else None
+    elif category_changed:
+        article.subcategory_id = None
 
     # Update fields
     article.title = title
@@ -142,15 +350,26 @@ def update_article(id):
 
     # Update thumbnail if a new file is provided
     file = request.files.get('thumbnail')
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        article.thumbnail = url_for('static', filename=f'uploads/{filename}', _external=True)
+    old_thumbnail = (article.thumbnail, article.thumbnail_variants)
+    try:
+        thumbnail_path, thumbnail_variants = save_thumbnail(file)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
+    if thumbnail_path:
+        article.thumbnail = thumbnail_path
+        article.thumbnail_variants = thumbnail_variants
 
     db.session.commit()
-    
-    return jsonify({'message': 'Article updated successfully', 'thumbnail': article.thumbnail}), 200
+    if thumbnail_path:
+        release_thumbnail(*old_thumbnail)
+    invalidate_article_caches()
+    pregenerate_audio(article)
+
+    return jsonify({
+        'message': 'Article updated successfully',
+        'thumbnail': article.thumbnail,
+        'thumbnail_variants': article.thumbnail_variants
+    }), 200
 
 # ✅ Delete Article
 @article_bp.route('/articles/<int:id>', methods=['DELETE'])
@@ -160,12 +379,10 @@ def delete_article(id):
     if not article:
         return jsonify({'message': 'Article not found'}), 404
 
-    # Delete the associated thumbnail if exists
-    if article.thumbnail:
-        thumbnail_path = os.path.join(UPLOAD_FOLDER, os.path.basename(article.thumbnail))
-        if os.path.exists(thumbnail_path):
-            os.remove(thumbnail_path)
-
+    old_thumbnail = (article.thumbnail, article.thumbnail_variants)
     db.session.delete(article)
     db.session.commit()
+    # Delete the associated thumbnail if no other row shares it
+    release_thumbnail(*old_thumbnail)
+    invalidate_article_caches()
     return jsonify({'message': 'Article deleted successfully'}), 200
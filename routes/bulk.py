@@ -0,0 +1,54 @@
+import codecs
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required
+from bulk import DEFAULT_CHUNK_SIZE, FORMATS, KINDS, ImportAborted, export_rows, format_rows, guess_format, import_rows, parse_rows
+
+bulk_bp = Blueprint('bulk', __name__)
+
+
+@bulk_bp.before_request
+def allow_large_imports():
+    # Imports are streamed line by line, so they may be far above MAX_CONTENT_LENGTH
+    request.max_content_length = current_app.config['BULK_MAX_CONTENT_LENGTH']
+
+
+# 📥 Bulk import: NDJSON/CSV request body (or a `file` upload), one report for the whole batch
+@bulk_bp.route('/bulk/<kind>', methods=['POST'])
+@jwt_required()
+def bulk_import(kind):
+    if kind not in KINDS:
+        return jsonify({'message': f"Unknown kind, expected one of: {', '.join(KINDS)}"}), 404
+
+    upload = request.files.get('file')
+    if upload:
+        stream, fmt = upload.stream, guess_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, guess_format(None, request.mimetype)
+    fmt = request.args.get('format', fmt)
+    if fmt not in FORMATS:
+        return jsonify({'message': f"Invalid format, expected one of: {', '.join(FORMATS)}"}), 400
+    chunk_size = min(max(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int), 1), 10000)
+
+    # Decoded line by line: the body is never held in memory as a whole
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    try:
+        report = import_rows(kind, parse_rows(lines, fmt), chunk_size)
+    except ImportAborted as e:
+        # Lines before the failure were imported: say which, not just that something broke
+        return jsonify({'message': str(e), **e.report}), 400
+    return jsonify(report), 200
+
+
+# 📤 Bulk export, streamed as NDJSON (default) or CSV
+@bulk_bp.route('/bulk/<kind>', methods=['GET'])
+@jwt_required()
+def bulk_export(kind):
+    if kind not in KINDS:
+        return jsonify({'message': f"Unknown kind, expected one of: {', '.join(KINDS)}"}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'message': f"Invalid format, expected one of: {', '.join(FORMATS)}"}), 400
+
+    return Response(stream_with_context(format_rows(export_rows(kind), fmt)), mimetype=FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={kind}.{fmt}'
+    })
@@ -1,20 +1,13 @@
-import os
-from flask import Blueprint, request, jsonify, url_for
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
+from cache import cache
+from conditional import conditional, table_versions
 from models import db, Category
-from werkzeug.utils import secure_filename
+from images import save_thumbnail, release_thumbnail
+from uploads import UploadError
 
 category_bp = Blueprint('category', __name__)
 
-UPLOAD_FOLDER = 'static/uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
 @category_bp.route('/categories', methods=['POST'])
 @jwt_required()
 def create_category():
@@ -25,23 +18,28 @@ def create_category():
     if not title or not slug:
         return jsonify({'message': 'Title and slug are required'}), 400
 
-    thumbnail_path = None
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        thumbnail_path = url_for('static', filename=f'uploads/{filename}', _external=True)
+    try:
+        thumbnail_path, thumbnail_variants = save_thumbnail(file)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
 
-    category = Category(title=title, slug=slug, thumbnail=thumbnail_path)
+    category = Category(title=title, slug=slug, thumbnail=thumbnail_path, thumbnail_variants=thumbnail_variants)
     db.session.add(category)
     db.session.commit()
+    cache.invalidate('categories')
 
-    return jsonify({'message': 'Category created', 'thumbnail': thumbnail_path}), 201
+    return jsonify({'message': 'Category created', 'thumbnail': thumbnail_path, 'thumbnail_variants': thumbnail_variants}), 201
 
 @category_bp.route('/categories', methods=['GET'])
+@conditional(lambda: table_versions(Category))
+@cache.cached('categories')
 def get_categories():
     categories = Category.query.all()
-    return jsonify([{'id': c.id, 'title': c.title, 'slug': c.slug, 'thumbnail': c.thumbnail} for c in categories])
+    return jsonify([{
+        'id': c.id, 'title': c.title, 'slug': c.slug,
+        'thumbnail': c.thumbnail, 'thumbnail_variants': c.thumbnail_variants,
+        'article_count': c.article_count
+    } for c in categories])
 
 @category_bp.route('/categories/<int:id>', methods=['PUT'])
 @jwt_required()
@@ -60,14 +58,24 @@ def update_category(id):
         category.slug = slug
 
     # Update thumbnail if a new file is provided
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        category.thumbnail = url_for('static', filename=f'uploads/{filename}', _external=True)
+    old_thumbnail = (category.thumbnail, category.thumbnail_variants)
+    try:
+        thumbnail_path, thumbnail_variants = save_thumbnail(file)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
+    if thumbnail_path:
+        category.thumbnail = thumbnail_path
+        category.thumbnail_variants = thumbnail_variants
 
     db.session.commit()
-    return jsonify({'message': 'Category updated successfully', 'thumbnail': category.thumbnail}), 200
+    if thumbnail_path:
+        release_thumbnail(*old_thumbnail)
+    cache.invalidate('categories')
+    return jsonify({
+        'message': 'Category updated successfully',
+        'thumbnail': category.thumbnail,
+        'thumbnail_variants': category.thumbnail_variants
+    }), 200
 
 
 @category_bp.route('/categories/<int:id>', methods=['DELETE'])
@@ -77,12 +85,10 @@ def delete_category(id):
     if not category:
         return jsonify({'message': 'Category not found'}), 404
 
-    # Delete the associated thumbnail if exists
-    if category.thumbnail:
-        thumbnail_path = os.path.join(UPLOAD_FOLDER, os.path.basename(category.thumbnail))
-        if os.path.exists(thumbnail_path):
-            os.remove(thumbnail_path)
-
+    old_thumbnail = (category.thumbnail, category.thumbnail_variants)
     db.session.delete(category)
     db.session.commit()
+    # Delete the associated thumbnail if no other row shares it
+    release_thumbnail(*old_thumbnail)
+    cache.invalidate('categories')
     return jsonify({'message': 'Category deleted successfully'}), 200
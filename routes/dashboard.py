@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required
 from models import db, Category, SubCategory, Article
+from http_client import all_stats
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -16,3 +17,9 @@ def get_dashboard_stats():
         'subcategories': subcategories,
         'articles': articles
     })
+
+@dashboard_bp.route('/dashboard-stats/outbound', methods=['GET'])
+@jwt_required()
+def get_outbound_stats():
+    # Latency / error counts and circuit state per third-party upstream
+    return jsonify(all_stats())
@@ -1,25 +1,78 @@
-import os
-import requests
-from flask import Blueprint, request, jsonify
+import json
+import hashlib
+from flask import Blueprint, Response, current_app, request, jsonify
+from cache import LRUCache, SingleFlight
+from http_client import CircuitOpenError, get_client
 
 gemini_bp = Blueprint('gemini', __name__)
 
-# Load API Key from environment variable
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+MISSING_KEY_ERROR = 'Missing GEMINI_API_KEY environment variable'
 
-if not GEMINI_API_KEY:
-    raise ValueError("Missing GEMINI_API_KEY environment variable")
+# ♻️ Identical prompts (summary/title/SEO templates) are answered from memory, and
+# concurrent identical prompts share a single upstream request.
+_prompt_cache = None
+_in_flight = SingleFlight()
+
+
+def _get_prompt_cache():
+    global _prompt_cache
+    if _prompt_cache is None:
+        config = current_app.config
+        _prompt_cache = LRUCache(config['GEMINI_CACHE_MAX_ENTRIES'], config['GEMINI_CACHE_TTL'])
+    return _prompt_cache
+
+
+def _auth_headers():
+    # In a header, not the URL: request URLs end up in exception messages and logs
+    return {'x-goog-api-key': current_app.config['GEMINI_API_KEY']}
+
+
+def prompt_key(prompt, model):
+    # Leading/trailing whitespace (e.g. a trailing newline) shares an entry; inner spacing can matter to the model
+    normalized = prompt.strip()
+    return hashlib.sha256(f'{model}\n{normalized}'.encode('utf-8')).hexdigest()
+
+
+def _call_gemini(prompt, model):
+    """One upstream generateContent call; returns (json body, status code)."""
+    url = f"/v1beta/models/{model}:generateContent"
+
+    # Request Payload
+    payload = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }]
+    }
+    current_app.logger.debug('Gemini payload: %s', payload)
+
+    # Send request to  API (pooled connection, timeouts, retries on 429/5xx)
+    client = get_client('gemini', current_app.config['GEMINI_API_BASE'])
+    response = client.post(url, json=payload, headers=_auth_headers(), endpoint='generateContent')
+    data = response.json()
+
+    current_app.logger.debug('Gemini response (%s): %s', response.status_code, data)
+
+    if response.status_code != 200:
+        return {'error': data.get('error', {}).get('message', 'Error calling  API')}, response.status_code
+
+    # Extract response text
+    response_text = data.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', 'No response generated')
+
+    return {'responseText': response_text}, 200
 
 
 @gemini_bp.route('/gemini', methods=['POST'])
 def generate_gemini_response():
-    try:
-        print("📢 Received request to /gemini")  # Debug Log
+    # Checked per request so a missing key only disables this endpoint
+    if not current_app.config.get('GEMINI_API_KEY'):
+        return jsonify({'error': MISSING_KEY_ERROR}), 503
 
+    import requests
+
+    try:
         # Read JSON body
         data = request.get_json(force=True)  # ✅ Force parsing JSON request
-
-        print(f"📢 Received Data: {data}")  # Debug Log
+        current_app.logger.debug('Gemini request: %s', data)
 
         if not data:
             return jsonify({'error': 'No JSON payload received'}), 400
@@ -28,37 +81,120 @@ def generate_gemini_response():
         if not prompt or not isinstance(prompt, str):
             return jsonify({'error': 'Invalid prompt provided'}), 400
 
-        print(f"📢 Sending prompt to Gemini API: {prompt}")  # Debug Log
-
-        # Gemini API Endpoint
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
-        
-        # Request Payload
-        payload = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }]
-        }
-        # Debug Log for payload
-        #
-        print(f"📢 Sending payload: {payload}")  # Debug Log
-
-        # Send request to  API
-        response = requests.post(url, json=payload, headers={'Content-Type': 'application/json'})
-        data = response.json()
-
-        print(f"📢  API Response: {data}")  # Debug Log
-
-        if response.status_code != 200:
-            return jsonify({'error': data.get('error', {}).get('message', 'Error calling  API')}), response.status_code
-
-        # Extract response text
-        response_text = data.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', 'No response generated')
-
-        print(f"📢 Extracted response text: {response_text}")  # Debug Log
+        model = current_app.config['GEMINI_MODEL']
+        key = prompt_key(prompt, model)
+        prompt_cache = _get_prompt_cache()
+
+        cached = prompt_cache.get(key)
+        if cached is not None:
+            response = jsonify({'responseText': cached})
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        (body, status), shared = _in_flight.do(key, lambda: _call_gemini(prompt, model))
+        if status == 200 and not shared:
+            prompt_cache.set(key, body['responseText'])
+
+        response = jsonify(body)
+        response.headers['X-Cache'] = 'COALESCED' if shared else 'MISS'
+        return response, status
+    except CircuitOpenError as e:
+        return jsonify({'error': str(e)}), 503
+    except requests.Timeout:
+        return jsonify({'error': 'Gemini API timed out'}), 504
+    except requests.RequestException as e:
+        current_app.logger.warning('Gemini request failed: %s', e)
+        return jsonify({'error': 'Error calling Gemini API'}), 502
+    except Exception:
+        # Details stay in the log: exception text can carry upstream URLs and payloads
+        current_app.logger.exception('Server error processing Gemini request')
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+def _sse(data, event=None):
+    message = f"event: {event}\n" if event else ''
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _relay_stream(upstream, logger):
+    """Re-emit upstream streamGenerateContent SSE chunks as {"text": ...} events.
+
+    The generator only reads from Gemini when the WSGI server asks for the next
+    chunk, so a slow client slows the upstream read instead of buffering the
+    whole completion in memory. When the client disconnects the server closes
+    this generator and `finally` drops the upstream connection. It runs outside
+    the app context, hence the `logger` argument.
+    """
+    import requests
+
+    upstream.encoding = 'utf-8'  # text/event-stream is UTF-8; requests would guess Latin-1
+    try:
+        # chunk_size=None: hand over each chunk as soon as it arrives
+        for line in upstream.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            try:
+                chunk = json.loads(line[len('data:'):].strip())
+                parts = chunk.get('candidates', [{}])[0].get('content', {}).get('parts', [])
+                text = ''.join(part.get('text', '') for part in parts)
+            except (ValueError, AttributeError, IndexError, TypeError):
+                # One bad chunk is reported and skipped; the rest of the answer still streams
+                logger.warning('Malformed Gemini stream chunk: %.200s', line)
+                yield _sse({'error': 'Malformed chunk from the Gemini API'}, event='error')
+                continue
+            if text:
+                yield _sse({'text': text})
+        yield _sse({}, event='done')
+    except requests.RequestException as e:
+        logger.warning('Gemini stream interrupted: %s', e)
+        yield _sse({'error': 'Upstream stream interrupted'}, event='error')
+    finally:
+        upstream.close()
+
+
+# ⚡ Streaming variant: tokens are pushed to the client as Server-Sent Events
+@gemini_bp.route('/gemini/stream', methods=['POST'])
+def stream_gemini_response():
+    if not current_app.config.get('GEMINI_API_KEY'):
+        return jsonify({'error': MISSING_KEY_ERROR}), 503
+
+    import requests
+
+    data = request.get_json(force=True, silent=True)
+    if not data:
+        return jsonify({'error': 'No JSON payload received'}), 400
+
+    prompt = data.get('prompt')
+    if not prompt or not isinstance(prompt, str):
+        return jsonify({'error': 'Invalid prompt provided'}), 400
+
+    model = current_app.config['GEMINI_MODEL']
+    url = f"/v1beta/models/{model}:streamGenerateContent?alt=sse"
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
 
-        return jsonify({'responseText': response_text})
-    # 
-    except Exception as e:
-        print(f"🔥 Server error processing Gemini request: {str(e)}")  # Debug Log
-        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+    try:
+        client = get_client('gemini', current_app.config['GEMINI_API_BASE'])
+        # The read timeout applies between chunks, not to the whole generation
+        upstream = client.post(url, json=payload, headers=_auth_headers(), stream=True,
+                               endpoint='streamGenerateContent')
+    except CircuitOpenError as e:
+        return jsonify({'error': str(e)}), 503
+    except requests.Timeout:
+        return jsonify({'error': 'Gemini API timed out'}), 504
+    except requests.RequestException as e:
+        current_app.logger.warning('Gemini stream request failed: %s', e)
+        return jsonify({'error': 'Error calling Gemini API'}), 502
+
+    if upstream.status_code != 200:
+        try:
+            message = upstream.json().get('error', {}).get('message', 'Error calling  API')
+        except ValueError:
+            message = 'Error calling  API'
+        finally:
+            upstream.close()
+        return jsonify({'error': message}), upstream.status_code
+
+    return Response(_relay_stream(upstream, current_app.logger), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # Keep nginx from buffering the stream
+    })
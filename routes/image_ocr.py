@@ -1,13 +1,52 @@
-import pytesseract
-from flask import Blueprint, request, jsonify, send_file
-from PIL import Image, ImageFilter
-from googletrans import Translator
-from fpdf import FPDF
-import tempfile
-import os
+import json
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context, url_for
+from models import OcrJob
+from metrics import record_ocr
+from ocr_engine import DEFAULT_LANG, OCR_CONFIG, iter_ocr, submit_ocr
+from ocr_jobs import maybe_sweep_jobs, serialize_job, submit_job
+from ocr_cache import ocr_cache, ocr_key, translation_key
+from http_client import get_client
+from exporters import FORMATS, export_chunks
+from uploads import OCR_FORMATS, UploadError, uploads
 
 ocr_bp = Blueprint('ocr', __name__)
-translator = Translator()
+_translator = None
+
+
+@ocr_bp.before_request
+def allow_larger_uploads():
+    # Bulk scans and jobs carry many images per request
+    request.max_content_length = current_app.config['OCR_MAX_CONTENT_LENGTH']
+
+
+@ocr_bp.before_request
+def sweep_jobs():
+    # Every few minutes per worker: resume jobs a dead worker left behind, drop expired ones
+    maybe_sweep_jobs()
+
+
+def read_images(image_files):
+    """(filename, bytes) for each upload; raises UploadError naming the offending file."""
+    images = []
+    for image_file in image_files:
+        try:
+            images.append((image_file.filename, uploads.read(image_file, OCR_FORMATS)))
+        except UploadError as e:
+            raise UploadError(f'{image_file.filename}: {e}', e.status)
+    return images
+
+
+def get_translator():
+    # googletrans (and its HTTP stack) is imported on the first translation, not at boot
+    global _translator
+    if _translator is None:
+        import httpx
+        from googletrans import Translator
+        config = current_app.config
+        _translator = Translator(timeout=httpx.Timeout(
+            config['OUTBOUND_READ_TIMEOUT'], connect=config['OUTBOUND_CONNECT_TIMEOUT']
+        ))
+    return _translator
 
 # 🔍 ENHANCED OCR
 @ocr_bp.route('/ocr', methods=['POST'])
@@ -16,21 +55,39 @@ def image_to_text():
         return jsonify({'error': 'No image uploaded'}), 400
 
     image_file = request.files['image']
-    lang = request.form.get('lang', 'eng+khm')  # Default to both
+    lang = request.form.get('lang', DEFAULT_LANG)  # Default to both
 
     try:
-        image = Image.open(image_file.stream).convert("L")
-        image = image.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))  # Auto-enhance
+        data = uploads.read(image_file, OCR_FORMATS)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
 
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(image, lang=lang, config=custom_config)
+    try:
+        # ♻️ Identical uploads are answered from the content-addressed cache
+        key = ocr_key(data, lang, OCR_CONFIG)
+        text = ocr_cache.get(key)
+        if text is None:
+            try:
+                # On the shared pool like bulk and jobs: OCR_WORKERS bounds tesseract's CPU use for every route
+                text, seconds = submit_ocr(data, lang, OCR_CONFIG, current_app.config['OCR_WORKERS']).result()
+            except Exception:
+                record_ocr('error', size=len(data))
+                raise
+            record_ocr('ocr', seconds, len(data))
+            ocr_cache.set(key, text)
+        else:
+            record_ocr('cached', size=len(data))
 
         # 🌐 Translate result
         translate_to = request.form.get('translate_to', 'en')  # Optional
         translated_text = ''
-        if translate_to:
-            translated = translator.translate(text, dest=translate_to)
-            translated_text = translated.text
+        if translate_to and text.strip():
+            key = translation_key(text, translate_to)
+            translated_text = ocr_cache.get(key)
+            if translated_text is None:
+                translated = get_client('translate').call('translate', get_translator().translate, text, dest=translate_to)
+                translated_text = translated.text
+                ocr_cache.set(key, translated_text)
 
         return jsonify({
             'text': text.strip(),
@@ -41,6 +98,7 @@ def image_to_text():
 
 
 # 📄 EXPORT OCR RESULT
+# Generated in memory / streamed straight into the response: no temp files.
 @ocr_bp.route('/ocr/export', methods=['POST'])
 def export_text():
     data = request.get_json()
@@ -50,52 +108,79 @@ def export_text():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
 
-    try:
-        if export_type == 'txt':
-            path = tempfile.mktemp(suffix='.txt')
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(text)
-        elif export_type == 'pdf':
-            path = tempfile.mktemp(suffix='.pdf')
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.set_font("Arial", size=12)
-            for line in text.splitlines():
-                pdf.multi_cell(0, 10, line)
-            pdf.output(path)
-        else:
-            return jsonify({'error': 'Invalid export type'}), 400
+    if export_type not in FORMATS:
+        return jsonify({'error': 'Invalid export type'}), 400
 
-        return send_file(path, as_attachment=True)
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    mimetype, extension = FORMATS[export_type]
+    return Response(export_chunks(text, export_type), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=export.{extension}'
+    })
 
 
 # 📂 BULK OCR SUPPORT
+# Images are OCR'd in parallel on the process pool. With ?stream=1 (or
+# Accept: application/x-ndjson) each result is sent as one NDJSON line the
+# moment it is ready, instead of one JSON blob at the end.
 @ocr_bp.route('/ocr/bulk', methods=['POST'])
 def bulk_ocr():
     if 'images' not in request.files:
         return jsonify({'error': 'No images uploaded'}), 400
 
-    image_files = request.files.getlist('images')
-    lang = request.form.get('lang', 'eng+khm')
-    results = []
+    lang = request.form.get('lang', DEFAULT_LANG)
+    max_concurrency = current_app.config['OCR_BULK_CONCURRENCY']
+    concurrency = min(request.form.get('concurrency', max_concurrency, type=int), max_concurrency)
+    stream = request.args.get('stream', type=int) or request.accept_mimetypes.best == 'application/x-ndjson'
 
+    # Read everything up front: the upload stream is gone once the response starts
     try:
-        for image_file in image_files:
-            image = Image.open(image_file.stream).convert("L")
-            image = image.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
+        images = read_images(request.files.getlist('images'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    results = iter_ocr(images, lang, concurrency, current_app.config['OCR_WORKERS'], cache=ocr_cache)
 
-            custom_config = r'--oem 3 --psm 6'
-            text = pytesseract.image_to_string(image, lang=lang, config=custom_config)
+    if stream:
+        def generate():
+            for position, filename, text, error in results:
+                line = {'index': position, 'filename': filename}
+                line.update({'error': error} if error else {'text': text})
+                yield json.dumps(line, ensure_ascii=False) + '\n'
 
-            results.append({
-                'filename': image_file.filename,
-                'text': text.strip()
-            })
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                        headers={'X-Accel-Buffering': 'no'})
 
-        return jsonify({'results': results})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    ordered = [None] * len(images)
+    for position, filename, text, error in results:
+        ordered[position] = {'filename': filename, **({'error': error} if error else {'text': text})}
+
+    return jsonify({'results': ordered})
+
+
+# ⏳ ASYNC OCR JOBS (returns immediately, poll for progress)
+@ocr_bp.route('/ocr/jobs', methods=['POST'])
+def create_ocr_job():
+    image_files = request.files.getlist('images') or request.files.getlist('image')
+    if not image_files:
+        return jsonify({'error': 'No images uploaded'}), 400
+
+    lang = request.form.get('lang', DEFAULT_LANG)
+    try:
+        images = read_images(image_files)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    job = submit_job(images, lang)
+
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'total': job.total,
+        'status_url': url_for('ocr.get_ocr_job', job_id=job.id, _external=True)
+    }), 202
+
+
+@ocr_bp.route('/ocr/jobs/<job_id>', methods=['GET'])
+def get_ocr_job(job_id):
+    job = OcrJob.query.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(serialize_job(job))
@@ -0,0 +1,52 @@
+import io
+import pstats
+from flask import Blueprint, jsonify, request, send_file
+from flask_jwt_extended import jwt_required
+from profiling import store
+
+profiles_bp = Blueprint('profiles', __name__)
+
+# kind -> (mimetype, download extension)
+DOWNLOADS = {
+    'pstats': ('application/octet-stream', 'pstats'),
+    'collapsed': ('text/plain; charset=utf-8', 'txt'),
+}
+
+
+def _top_functions(path, limit):
+    # The same table `python -m pstats` prints, sorted by cumulative time
+    output = io.StringIO()
+    pstats.Stats(path, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+# 🔬 Recent request profiles, newest first
+@profiles_bp.route('/profiles', methods=['GET'])
+@jwt_required()
+def list_profiles():
+    if store.directory is None:
+        return jsonify({'message': 'Profiling is disabled (set PROFILING_ENABLED=1)'}), 404
+    return jsonify({'profiles': store.list()})
+
+
+@profiles_bp.route('/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+def get_profile(profile_id):
+    meta = store.get(profile_id) if store.directory and profile_id.replace('-', '').isalnum() else None
+    if meta is None:
+        return jsonify({'message': 'Profile not found'}), 404
+    if 'pstats' in meta['files']:
+        meta['top'] = _top_functions(store.path(profile_id, 'pstats'), request.args.get('limit', 30, type=int))
+    return jsonify(meta)
+
+
+# 📥 Raw profile: pstats for snakeviz / pstats, collapsed stacks for flamegraph.pl / speedscope
+@profiles_bp.route('/profiles/<profile_id>.<kind>', methods=['GET'])
+@jwt_required()
+def download_profile(profile_id, kind):
+    meta = store.get(profile_id) if store.directory and profile_id.replace('-', '').isalnum() else None
+    if meta is None or kind not in DOWNLOADS or kind not in meta['files']:
+        return jsonify({'message': 'Profile not found'}), 404
+    mimetype, extension = DOWNLOADS[kind]
+    return send_file(store.path(profile_id, kind), mimetype=mimetype, as_attachment=True,
+                     download_name=f'profile-{profile_id}.{extension}')
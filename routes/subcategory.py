@@ -1,19 +1,26 @@
-import os
-from flask import Blueprint, request, jsonify, url_for
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from models import db, SubCategory, Category
-from werkzeug.utils import secure_filename
+from sqlalchemy.orm import joinedload
+from cache import cache
+from conditional import conditional, table_versions
+from models import db, Article, SubCategory, Category, bump_table_versions
+from pagination import InvalidCursor, keyset_paginate, wants_cursor
+from images import save_thumbnail, release_thumbnail
+from uploads import UploadError
 
 subcategory_bp = Blueprint('subcategory', __name__)
 
-UPLOAD_FOLDER = 'static/uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+def serialize_subcategory(s):
+    return {
+        'id': s.id,
+        'title': s.title,
+        'slug': s.slug,
+        'thumbnail': s.thumbnail,
+        'thumbnail_variants': s.thumbnail_variants,
+        'category_id': s.category_id,
+        'category_title': s.category.title if s.category else None,
+        'article_count': s.article_count
+    }
 
 
 # ✅ Create Subcategory
@@ -33,41 +40,52 @@ def create_subcategory():
     if not category:
         return jsonify({'message': 'Category not found'}), 404
 
-    thumbnail_path = None
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        thumbnail_path = url_for('static', filename=f'uploads/{filename}', _external=True)
+    try:
+        thumbnail_path, thumbnail_variants = save_thumbnail(file)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
 
-    subcategory = SubCategory(title=title, slug=slug, thumbnail=thumbnail_path, category_id=category_id)
+    subcategory = SubCategory(
+        title=title, slug=slug, thumbnail=thumbnail_path,
+        thumbnail_variants=thumbnail_variants, category_id=category_id
+    )
     db.session.add(subcategory)
     db.session.commit()
+    cache.invalidate('subcategories')
 
-    return jsonify({'message': 'Subcategory created', 'thumbnail': thumbnail_path}), 201
+    return jsonify({'message': 'Subcategory created', 'thumbnail': thumbnail_path, 'thumbnail_variants': thumbnail_variants}), 201
 
 
 # ✅ Get All Subcategories (Optional Search by Title)
 @subcategory_bp.route('/subcategories', methods=['GET'])
+@conditional(lambda: table_versions(SubCategory, Category))
+@cache.cached('subcategories', 'categories')
 def get_subcategories():
     search_query = request.args.get('search', '')
-    
+
+    query = SubCategory.query.options(joinedload(SubCategory.category))
     if search_query:
-        subcategories = SubCategory.query.filter(SubCategory.title.ilike(f"%{search_query}%")).all()
-    else:
-        subcategories = SubCategory.query.all()
-
-    return jsonify([
-        {
-            'id': s.id,
-            'title': s.title,
-            'slug': s.slug,
-            'thumbnail': s.thumbnail,
-            'category_id': s.category_id,
-            'category_title': s.category.title if s.category else None
-        }
-        for s in subcategories
-    ])
+        query = query.filter(SubCategory.title.ilike(f"%{search_query}%"))
+
+    # Paged mode (?limit= / ?after= / ?before=) returns an object with cursors;
+    # without those parameters the full list is returned as before.
+    if wants_cursor(request.args) or 'limit' in request.args:
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        try:
+            subcategories, next_cursor, prev_cursor = keyset_paginate(
+                query, SubCategory.id, limit,
+                after=request.args.get('after'), before=request.args.get('before')
+            )
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+
+        return jsonify({
+            'subcategories': [serialize_subcategory(s) for s in subcategories],
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        })
+
+    return jsonify([serialize_subcategory(s) for s in query.all()])
 
 
 # ✅ Update Subcategory
@@ -87,21 +105,43 @@ def update_subcategory(id):
         subcategory.title = title
     if slug:
         subcategory.slug = slug
-    if category_id:
+    moved = 0
+    if category_id and str(category_id) != str(subcategory.category_id):
         category = Category.query.get(category_id)
         if not category:
             return jsonify({'message': 'Category not found'}), 404
-        subcategory.category_id = category_id
+        old_category_id = subcategory.category_id
+        subcategory.category_id = category.id
+        # Its articles move with it in the same transaction, so category listings and counts
+        # keep agreeing with the subcategory's (Query.update skips the mapper events)
+        moved = Article.query.filter_by(subcategory_id=id).update({'category_id': category.id},
+                                                                   synchronize_session=False)
+        if moved:
+            Category.query.filter_by(id=old_category_id).update(
+                {'article_count': Category.article_count - moved}, synchronize_session=False)
+            Category.query.filter_by(id=category.id).update(
+                {'article_count': Category.article_count + moved}, synchronize_session=False)
+            bump_table_versions(db.session.connection(), Article, Category)
 
     # Update thumbnail if a new file is provided
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        subcategory.thumbnail = url_for('static', filename=f'uploads/{filename}', _external=True)
+    old_thumbnail = (subcategory.thumbnail, subcategory.thumbnail_variants)
+    try:
+        thumbnail_path, thumbnail_variants = save_thumbnail(file)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
+    if thumbnail_path:
+        subcategory.thumbnail = thumbnail_path
+        subcategory.thumbnail_variants = thumbnail_variants
 
     db.session.commit()
-    return jsonify({'message': 'Subcategory updated successfully', 'thumbnail': subcategory.thumbnail}), 200
+    if thumbnail_path:
+        release_thumbnail(*old_thumbnail)
+    cache.invalidate('subcategories', *(('articles', 'categories') if moved else ()))
+    return jsonify({
+        'message': 'Subcategory updated successfully',
+        'thumbnail': subcategory.thumbnail,
+        'thumbnail_variants': subcategory.thumbnail_variants
+    }), 200
 
 
 # ✅ Delete Subcategory
@@ -112,12 +152,13 @@ def delete_subcategory(id):
     if not subcategory:
         return jsonify({'message': 'Subcategory not found'}), 404
 
-    # Delete the associated thumbnail if exists
-    if subcategory.thumbnail:
-        thumbnail_path = os.path.join(UPLOAD_FOLDER, os.path.basename(subcategory.thumbnail))
-        if os.path.exists(thumbnail_path):
-            os.remove(thumbnail_path)
-
+    old_thumbnail = (subcategory.thumbnail, subcategory.thumbnail_variants)
+    # Detach its articles in one statement instead of loading them all
+    Article.query.filter_by(subcategory_id=id).update({'subcategory_id': None}, synchronize_session=False)
+    bump_table_versions(db.session.connection(), Article)  # Query.update skips the mapper events
     db.session.delete(subcategory)
     db.session.commit()
+    # Delete the associated thumbnail if no other row shares it
+    release_thumbnail(*old_thumbnail)
+    cache.invalidate('subcategories', 'articles')
     return jsonify({'message': 'Subcategory deleted successfully'}), 200
@@ -1,11 +1,20 @@
 # routes/texttospeech.py
-from flask import Blueprint, request, send_file, jsonify
-from gtts import gTTS
-import os
-from io import BytesIO
+from flask import Blueprint, current_app, request, send_file, jsonify, url_for
+from http_client import CircuitOpenError, get_client
+from models import Article
+from tts_audio import article_speech_text, audio_cache, audio_key
 
 tts_bp = Blueprint('tts', __name__)
 
+
+def _send_audio(path, cached):
+    # conditional=True gives Range/206 support, so players can seek without re-downloading
+    response = send_file(path, mimetype='audio/mpeg', as_attachment=False,
+                         download_name='speech.mp3', conditional=True, max_age=86400)
+    response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+    return response
+
+
 @tts_bp.route('/tts', methods=['POST'])
 def text_to_speech():
     data = request.get_json()
@@ -16,11 +25,37 @@ def text_to_speech():
         return jsonify({'error': 'No text provided'}), 400
 
     try:
-        tts = gTTS(text=text, lang=lang)
-        audio = BytesIO()
-        tts.write_to_fp(audio)
-        audio.seek(0)
+        path, cached = audio_cache.get_or_create(text, lang, get_client('tts'))
+        response = _send_audio(path, cached)
+        # Stable GET URL for the same audio, for players that seek with Range requests
+        response.headers['X-Audio-Url'] = url_for('tts.get_cached_audio', key=audio_key(text, lang), _external=True)
+        return response
+    except CircuitOpenError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return send_file(audio, mimetype='audio/mp3', as_attachment=False, download_name='speech.mp3')
+
+@tts_bp.route('/tts/audio/<key>.mp3', methods=['GET'])
+def get_cached_audio(key):
+    path = audio_cache.get(key) if key.isalnum() else None
+    if not path:
+        return jsonify({'error': 'Audio not found'}), 404
+    return _send_audio(path, True)
+
+
+@tts_bp.route('/tts/articles/<slug>', methods=['GET'])
+def article_audio(slug):
+    article = Article.query.filter_by(slug=slug).first()
+    if not article:
+        return jsonify({'error': 'Article not found'}), 404
+
+    lang = request.args.get('lang', current_app.config['TTS_ARTICLE_LANG'])
+    text = article_speech_text(article.title, article.body)
+    try:
+        path, cached = audio_cache.get_or_create(text, lang, get_client('tts'))
+        return _send_audio(path, cached)
+    except CircuitOpenError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
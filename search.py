@@ -0,0 +1,130 @@
+import re
+from sqlalchemy import Integer, column, false, text
+from db import db
+from models import Article
+
+# Full-text search over Article.title / Article.body.
+#
+# On SQLite the index is an external-content FTS5 table that shadows `article`.
+# Triggers keep it in sync on every INSERT/UPDATE/DELETE, so route handlers (and
+# anything else writing to `article`) never have to remember to update it.
+# Migration 0008_article_search creates both; `ensure_search_index` does the
+# same for databases built with create_all() (init-db, benchmarks). Requests
+# never create them. Other databases fall back to a plain ILIKE scan until a
+# native backend is added.
+
+FTS_TABLE = 'article_fts'
+
+# bm25() column weights: a hit in the title counts for more than one in the body
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, body,
+        content='article', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS article_fts_ai AFTER INSERT ON article BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS article_fts_ad AFTER DELETE ON article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS article_fts_au AFTER UPDATE OF title, body ON article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+_ready_engines = set()
+
+
+def fts_enabled():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def ensure_search_index():
+    """Create the FTS table and sync triggers if missing (idempotent, once per engine)."""
+    engine = db.engine
+    if engine.url in _ready_engines or not fts_enabled():
+        return
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        for ddl in _FTS_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            # Index the rows that were written before the FTS table existed
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+    _ready_engines.add(engine.url)
+
+
+def rebuild_search_index():
+    ensure_search_index()
+    if fts_enabled():
+        with db.engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(search_query):
+    """Turn free user input into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term (`"word"*`) and terms are ANDed, so
+    "flask ap" matches articles containing "flask" and a word starting with "ap".
+    Quoting neutralises FTS operators (AND/OR/NEAR, column filters, parentheses).
+    """
+    terms = re.findall(r'\w+', search_query or '', flags=re.UNICODE)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching_ids_clause(search_query):
+    """SQL expression filtering `Article` to rows matching `search_query`."""
+    if not fts_enabled():
+        pattern = f"%{search_query}%"
+        return Article.title.ilike(pattern) | Article.body.ilike(pattern)
+
+    match = build_match_query(search_query)
+    if not match:
+        return false()
+
+    return Article.id.in_(
+        text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match")
+        .bindparams(match=match)
+        .columns(column('rowid', Integer))
+    )
+
+
+def search_article_ids(search_query, limit, offset=0):
+    """Return article ids matching `search_query`, best BM25 rank first."""
+    if not fts_enabled():
+        rows = (Article.query.with_entities(Article.id)
+                .filter(matching_ids_clause(search_query))
+                .order_by(Article.id.desc())
+                .limit(limit).offset(offset).all())
+        return [row.id for row in rows]
+
+    match = build_match_query(search_query)
+    if not match:
+        return []
+
+    rows = db.session.execute(
+        text(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+            f"ORDER BY bm25({FTS_TABLE}, :title_weight, :body_weight) "
+            "LIMIT :limit OFFSET :offset"
+        ),
+        {
+            'match': match,
+            'title_weight': TITLE_WEIGHT,
+            'body_weight': BODY_WEIGHT,
+            'limit': limit,
+            'offset': offset,
+        }
+    )
+    return [row[0] for row in rows]
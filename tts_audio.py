@@ -0,0 +1,162 @@
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from flask import current_app
+from cache import SingleFlight
+from http_client import get_client
+from models import make_excerpt
+
+# Text-to-speech audio cache.
+#
+# Synthesised MP3s are stored on disk under sha256(lang + text), so the same
+# text is only sent to Google once; the directory is bounded by size and the
+# least recently used files are evicted first. Long texts are split on sentence
+# boundaries and the pieces are synthesised in parallel: MP3 frames can simply
+# be concatenated, which is what gTTS itself does between its own requests.
+# Only the synthesis goes through the outbound client: cache hits are not
+# upstream calls, and they are still served while its circuit is open.
+
+SENTENCE_END = re.compile(r'(?<=[.!?។៕])\s+')
+
+
+def audio_key(text, lang):
+    return hashlib.sha256(f'{lang}\n{text}'.encode('utf-8')).hexdigest()
+
+
+def split_text(text, max_chars):
+    """Group sentences into pieces of at most `max_chars` (longer sentences stand alone)."""
+    pieces, current = [], ''
+    for sentence in SENTENCE_END.split(text.strip()):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f'{current} {sentence}' if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _synthesize_piece(text, lang, timeout=None):
+    from gtts import gTTS
+
+    audio = BytesIO()
+    gTTS(text=text, lang=lang, timeout=timeout).write_to_fp(audio)
+    return audio.getvalue()
+
+
+class AudioCache:
+    def __init__(self, app=None):
+        self.directory = None
+        self.max_bytes = 0
+        self.chunk_chars = 500
+        self.timeout = None
+        self._pool = None
+        self._background = None
+        self._in_flight = SingleFlight()
+        self._evict_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('TTS_CACHE_DIR'):
+            app.config['TTS_CACHE_DIR'] = os.path.join(app.instance_path, 'tts_cache')
+        app.config.setdefault('TTS_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+        app.config.setdefault('TTS_WORKERS', 4)
+        app.config.setdefault('TTS_CHUNK_CHARS', 500)
+
+        self.directory = app.config['TTS_CACHE_DIR']
+        self.max_bytes = app.config['TTS_CACHE_MAX_BYTES']
+        self.chunk_chars = app.config['TTS_CHUNK_CHARS']
+        # (connect, read) for gTTS's requests, the same limits as every other outbound call
+        self.timeout = (app.config.get('OUTBOUND_CONNECT_TIMEOUT', 3.05), app.config.get('OUTBOUND_READ_TIMEOUT', 30))
+        # Synthesis is network-bound, so threads are enough
+        self._pool = ThreadPoolExecutor(max_workers=app.config['TTS_WORKERS'], thread_name_prefix='tts')
+        # Pre-generation runs one article at a time so it never starves live requests
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tts-pregen')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f'{key}.mp3')
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # mtime doubles as last-access time for eviction
+        except FileNotFoundError:
+            return None  # Never cached, or evict() removed it just now
+        return path
+
+    def synthesize(self, text, lang):
+        pieces = split_text(text, self.chunk_chars)
+        if len(pieces) <= 1:
+            return _synthesize_piece(text, lang, self.timeout)
+        # map() keeps the pieces in order while they are fetched concurrently
+        return b''.join(self._pool.map(lambda piece: _synthesize_piece(piece, lang, self.timeout), pieces))
+
+    def get_or_create(self, text, lang, client=None):
+        """Path to the cached MP3 for `text`, synthesising it (once, through `client` if given) if needed."""
+        key = audio_key(text, lang)
+        path = self.get(key)
+        if path:
+            return path, True
+
+        def create():
+            if client is None:
+                data = self.synthesize(text, lang)
+            else:
+                data = client.call('synthesize', self.synthesize, text, lang)
+            target = self.path_for(key)
+            tmp = f'{target}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, target)
+            self.evict()
+            return target
+
+        path, _ = self._in_flight.do(key, create)
+        return path, False
+
+    def evict(self):
+        """Delete least recently used files until the directory fits TTS_CACHE_MAX_BYTES."""
+        if not self.max_bytes:
+            return
+        with self._evict_lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.mp3'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def pregenerate(self, text, lang):
+        """Synthesise `text` in the background so the first listener gets a cache hit."""
+        if self._background is None:
+            return None
+        # Resolved here: the background thread has no app context
+        client, logger = get_client('tts'), current_app.logger
+
+        def run():
+            try:
+                self.get_or_create(text, lang, client)
+            except Exception:
+                logger.exception('TTS pre-generation failed')
+        return self._background.submit(run)
+
+
+def article_speech_text(title, body):
+    return f'{title}. {make_excerpt(body, length=None)}'
+
+
+audio_cache = AudioCache()
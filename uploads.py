@@ -0,0 +1,178 @@
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from flask import current_app, g, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Upload handling shared by the thumbnail and OCR endpoints.
+#
+# MAX_CONTENT_LENGTH caps every request body: Werkzeug rejects an oversized
+# Content-Length before parsing anything, and stops reading a body that lies
+# about it. Each file is then identified by its magic bytes (not its name) and
+# copied to disk in chunks while it is hashed, so a large upload never sits in
+# worker memory as one bytes object. Encoding thumbnail variants and deleting
+# replaced files runs on a background thread once the request has what it
+# needs to answer.
+
+CHUNK_SIZE = 64 * 1024
+
+# (format, [(offset, bytes), ...]): every part must match
+SIGNATURES = [
+    ('png', [(0, b'\x89PNG\r\n\x1a\n')]),
+    ('jpeg', [(0, b'\xff\xd8\xff')]),
+    ('gif', [(0, b'GIF87a')]),
+    ('gif', [(0, b'GIF89a')]),
+    ('webp', [(0, b'RIFF'), (8, b'WEBP')]),
+    ('tiff', [(0, b'II*\x00')]),
+    ('tiff', [(0, b'MM\x00*')]),
+    ('bmp', [(0, b'BM')]),
+]
+IMAGE_FORMATS = ('png', 'jpeg', 'gif', 'webp')
+OCR_FORMATS = IMAGE_FORMATS + ('tiff', 'bmp')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff(head):
+    """Image format named by the first bytes of a file, or None."""
+    for fmt, parts in SIGNATURES:
+        if all(head[offset:offset + len(magic)] == magic for offset, magic in parts):
+            return fmt
+    return None
+
+
+def _check_format(file, formats):
+    head = file.stream.read(16)
+    file.stream.seek(0)
+    fmt = sniff(head)
+    if fmt not in formats:
+        raise UploadError(f"Unsupported file type (expected {', '.join(f.upper() for f in formats)})", 415)
+    return fmt
+
+
+def _chunks(file, max_bytes):
+    size = 0
+    while True:
+        chunk = file.stream.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise UploadError(f'File too large (limit {max_bytes} bytes)', 413)
+        yield chunk
+
+
+class StoredUpload:
+    def __init__(self, path, digest, fmt, size):
+        self.path = path
+        self.digest = digest
+        self.format = fmt
+        self.size = size
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class UploadService:
+    def __init__(self, app=None):
+        self.max_file_bytes = 0
+        self.background = True
+        self._executor = None
+        self._owner = None
+        self._lock = threading.Lock()
+        self._held = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MAX_CONTENT_LENGTH', 16 * 1024 * 1024)
+        app.config.setdefault('UPLOAD_MAX_FILE_BYTES', 10 * 1024 * 1024)
+        app.config.setdefault('UPLOAD_BACKGROUND', True)
+
+        self.max_file_bytes = app.config['UPLOAD_MAX_FILE_BYTES']
+        self.background = app.config['UPLOAD_BACKGROUND']
+
+        app.teardown_request(self._release_holds)
+
+        @app.errorhandler(RequestEntityTooLarge)
+        def request_too_large(e):
+            return jsonify({'message': 'Request body too large'}), 413
+
+    def store(self, file, directory, formats=IMAGE_FORMATS):
+        """Copy an uploaded file into `directory`, hashing it on the way; returns a StoredUpload."""
+        fmt = _check_format(file, formats)
+        sha256 = hashlib.sha256()
+        size = 0
+        handle, path = tempfile.mkstemp(dir=directory, suffix='.upload')
+        try:
+            with os.fdopen(handle, 'wb') as out:
+                for chunk in _chunks(file, self.max_file_bytes):
+                    sha256.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return StoredUpload(path, sha256.hexdigest(), fmt, size)
+
+    def read(self, file, formats=OCR_FORMATS):
+        """Bytes of an uploaded file after the type and size checks (for work that needs them in memory)."""
+        _check_format(file, formats)
+        return b''.join(_chunks(file, self.max_file_bytes))
+
+    def hold(self, digest):
+        """Mark `digest` as in use until the current request ends (committed or not)."""
+        with self._lock:
+            self._held[digest] += 1
+        g.setdefault('upload_holds', []).append(digest)
+
+    def is_held(self, digest):
+        """Whether a request of this process is still saving a row that points at `digest`."""
+        with self._lock:
+            return self._held[digest] > 0
+
+    def _release_holds(self, exc=None):
+        with self._lock:
+            for digest in g.pop('upload_holds', ()):
+                self._held[digest] -= 1
+                if not self._held[digest]:
+                    del self._held[digest]
+
+    def _get_executor(self):
+        # Created on first use in each process: a preloading server forks after
+        # create_app(), and threads do not survive a fork
+        with self._lock:
+            if self._executor is None or self._owner != os.getpid():
+                # One thread keeps writes and deletes in submission order
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='uploads')
+                self._owner = os.getpid()
+            return self._executor
+
+    def submit(self, fn, *args):
+        """Run `fn(*args)` in an app context after the response (inline with UPLOAD_BACKGROUND off)."""
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                try:
+                    fn(*args)
+                except Exception:
+                    app.logger.exception('Upload task %s failed', fn.__name__)
+
+        if not self.background:
+            run()
+            return None
+        return self._get_executor().submit(run)
+
+
+uploads = UploadService()